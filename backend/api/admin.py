@@ -11,6 +11,7 @@ from .models import (
     EmailVerification,
     Event,
     EventReminder,
+    FeedEntry,
     FollowPage,
     Friendship,
     Instructor,
@@ -18,6 +19,7 @@ from .models import (
     MessageMedia,
     MessageReaction,
     Notification,
+    OutboxEmail,
     Page,
     Post,
     PostMedia,
@@ -27,29 +29,52 @@ from .models import (
     UniversityDomain,
     UserProfile,
 )
+from .routers import read_from_replica
 
-admin.site.register(UserProfile)
-admin.site.register(EmailVerification)
-admin.site.register(Page)
-admin.site.register(Admin)
-admin.site.register(Instructor)
-admin.site.register(Student)
-admin.site.register(Friendship)
-admin.site.register(Notification)
-admin.site.register(Community)
-admin.site.register(CommunityMember)
-admin.site.register(Event)
-admin.site.register(EventReminder)
-admin.site.register(Post)
-admin.site.register(PostMedia)
-admin.site.register(Comment)
-admin.site.register(PostReaction)
-admin.site.register(CommentReaction)
-admin.site.register(FollowPage)
-admin.site.register(Conversation)
-admin.site.register(ConversationMember)
-admin.site.register(Message)
-admin.site.register(MessageMedia)
-admin.site.register(MessageReaction)
-admin.site.register(Report)
-admin.site.register(UniversityDomain)
+
+class ReplicaChangeListAdmin(admin.ModelAdmin):
+    """Reads changelist pages from a replica; forms, actions and everything else stay on the primary."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with read_from_replica():
+            response = super().changelist_view(request, extra_context)
+            # template responses query lazily, so render while still on the replica
+            return response.render() if hasattr(response, "render") else response
+
+
+class CountersReadOnlyAdmin(ReplicaChangeListAdmin):
+    """The denormalized counters are shown but not edited, they are not saved anyway (see Post.save)."""
+
+    def get_readonly_fields(self, request, obj=None):
+        return (*super().get_readonly_fields(request, obj), *self.model.COUNTERS)
+
+
+admin.site.register(UserProfile, ReplicaChangeListAdmin)
+admin.site.register(EmailVerification, ReplicaChangeListAdmin)
+admin.site.register(OutboxEmail, ReplicaChangeListAdmin)
+admin.site.register(Page, ReplicaChangeListAdmin)
+admin.site.register(Admin, ReplicaChangeListAdmin)
+admin.site.register(Instructor, ReplicaChangeListAdmin)
+admin.site.register(Student, ReplicaChangeListAdmin)
+admin.site.register(Friendship, ReplicaChangeListAdmin)
+admin.site.register(Notification, ReplicaChangeListAdmin)
+admin.site.register(Community, ReplicaChangeListAdmin)
+admin.site.register(CommunityMember, ReplicaChangeListAdmin)
+admin.site.register(Event, ReplicaChangeListAdmin)
+admin.site.register(EventReminder, ReplicaChangeListAdmin)
+admin.site.register(Post, CountersReadOnlyAdmin)
+admin.site.register(PostMedia, ReplicaChangeListAdmin)
+admin.site.register(Comment, CountersReadOnlyAdmin)
+admin.site.register(PostReaction, ReplicaChangeListAdmin)
+admin.site.register(CommentReaction, ReplicaChangeListAdmin)
+admin.site.register(FollowPage, ReplicaChangeListAdmin)
+admin.site.register(Conversation, ReplicaChangeListAdmin)
+admin.site.register(ConversationMember, ReplicaChangeListAdmin)
+admin.site.register(Message, ReplicaChangeListAdmin)
+admin.site.register(MessageMedia, ReplicaChangeListAdmin)
+admin.site.register(MessageReaction, ReplicaChangeListAdmin)
+admin.site.register(Report, ReplicaChangeListAdmin)
+admin.site.register(UniversityDomain, ReplicaChangeListAdmin)
+admin.site.register(FeedEntry, ReplicaChangeListAdmin)
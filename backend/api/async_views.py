@@ -0,0 +1,102 @@
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions
+from rest_framework.views import APIView
+
+# DRF's APIView runs its handlers synchronously; under ASGI that costs every request a hop to the
+# sync thread. AsyncAPIView keeps DRF's request, content negotiation, authentication, permissions,
+# throttles and exception handling, but awaits `async def` handlers on the event loop. Authenticators
+# that have an `aauthenticate` coroutine (api.authentication.CachedJWTAuthentication) are awaited too,
+# any other one runs in a thread. Permission and throttle classes run on the event loop as they are,
+# so they must not query the database (IsAuthenticated and the buckets of api/throttling.py do not).
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # options() and http_method_not_allowed() stay DRF's sync ones
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """APIView.initial() with the authentication awaited."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        """Request._authenticate(), awaiting each authenticator, so request.user is set before anything reads it."""
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, "aauthenticate", None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+def async_api_view(http_method_names):
+    """@api_view for `async def` function views. Goes with DRF's @permission_classes, @throttle_classes, etc."""
+
+    def decorator(func):
+        WrappedAPIView = type("WrappedAPIView", (AsyncAPIView,), {"__doc__": func.__doc__})
+        WrappedAPIView.http_method_names = [method.lower() for method in {*http_method_names, "options"}]
+
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        for method in http_method_names:
+            setattr(WrappedAPIView, method.lower(), handler)
+
+        WrappedAPIView.__name__ = func.__name__
+        WrappedAPIView.__module__ = func.__module__
+        for policy in (
+            "renderer_classes",
+            "parser_classes",
+            "authentication_classes",
+            "throttle_classes",
+            "permission_classes",
+            "schema",
+        ):
+            setattr(WrappedAPIView, policy, getattr(func, policy, getattr(APIView, policy)))
+
+        # a coroutine function (Django checks view_is_async), csrf exempt like every APIView
+        return WrappedAPIView.as_view()
+
+    return decorator
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# the rows every authenticated view may need (avatar, university page, role), joined into the user query
+USER_RELATIONS = ("profile", "student_profile", "instructor_profile")
+
+
+def _ttl():
+    return getattr(settings, "AUTH_USER_CACHE_TTL", 60)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    """Called by api/signals.py when the user or one of USER_RELATIONS is saved or deleted."""
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication whose user (with USER_RELATIONS) comes from the cache for AUTH_USER_CACHE_TTL
+    seconds, so in steady state an authenticated request makes no query for its user. The token's
+    signature and expiry, the active flag and the revoke check are still checked on every request."""
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related(*USER_RELATIONS).get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed("User not found", code="user_not_found") from e
+            cache.set(key, user, timeout=_ttl())
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for api.async_views: the token is checked in-process, a cache miss loads the user
+        with the async ORM."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id)
+        # the local-memory cache answers without I/O; its a* methods would only add a thread hop
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = await self.user_model.objects.select_related(*USER_RELATIONS).aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed("User not found", code="user_not_found") from e
+            cache.set(key, user, timeout=_ttl())
+        return self.check_user(user, validated_token)
+
+    # the rest of JWTAuthentication.get_user, run on cached users too
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+    @staticmethod
+    def check_user(user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+
+        return user
@@ -0,0 +1,139 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+# Blacklisted refresh-token JTIs, kept in a Bloom filter so the common case (a token that was never
+# blacklisted) is answered without any query. The filter is built on first use and then synced, with
+# one primary-key range query for the rows added since, only when the blacklist generation in the
+# shared cache moved (bumped by api/signals.py whenever a token is blacklisted or un-blacklisted) or
+# BLACKLIST_SYNC_SECONDS went by. A token revoked on another worker is therefore refused as soon as its
+# commit bumps the generation, or, when CACHES is not shared between workers (locmem) or the key was
+# evicted, at most BLACKLIST_SYNC_SECONDS later. Only a probable hit looks the JTI up, and its answer is
+# remembered until the generation moves. This process's own blacklistings are added at once. Everything
+# is read from the primary: a replica may not have the newest rows yet.
+
+GENERATION_KEY = "blacklist:generation"
+
+
+def _sync_seconds():
+    return getattr(settings, "BLACKLIST_SYNC_SECONDS", 30)
+
+
+def bump_generation():
+    """Tells every worker sharing the cache to sync on its next check."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class JtiBlacklist:
+    def __init__(self, error_rate=0.01, exact_size=10000):
+        self.error_rate = error_rate
+        self.exact_size = exact_size
+        self.lock = threading.Lock()
+        self.filter = None
+        # the id of the newest BlacklistedToken in the filter
+        self.last_id = 0
+        # jti -> bool, the database's answer for recent probable hits
+        self.exact = {}
+        # the shared generation seen by the last sync, and when the next one is due anyway
+        self.generation = None
+        self.next_sync = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(getattr(settings, "BLACKLIST_FALSE_POSITIVE_RATE", 0.01))
+
+    @staticmethod
+    def _tokens():
+        return BlacklistedToken.objects.using(DEFAULT_DB_ALIAS)
+
+    def rebuild(self):
+        generation = cache.get(GENERATION_KEY)
+        rows = self._tokens().order_by("id").values_list("id", "token__jti")
+        jtis, last_id = [], 0
+        for last_id, jti in rows.iterator():
+            jtis.append(jti)
+        # room to grow before the error rate degrades; sync() rebuilds once it fills up
+        bloom = BloomFilter(max(len(jtis) * 2, 10000), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self.lock:
+            self.filter, self.last_id = bloom, last_id
+            self.exact.clear()
+            self.generation, self.next_sync = generation, time.monotonic() + _sync_seconds()
+
+    def sync(self):
+        if self.filter is None or self.filter.count >= self.filter.capacity:
+            self.rebuild()
+            return
+        # read before the rows, so a bump while they are read is not missed
+        generation = cache.get(GENERATION_KEY)
+        if generation == self.generation and time.monotonic() < self.next_sync:
+            return
+        rows = self._tokens().filter(id__gt=self.last_id).order_by("id").values_list("id", "token__jti")
+        with self.lock:
+            # remembered answers may be stale too (e.g. a token un-blacklisted elsewhere)
+            self.exact.clear()
+            self.generation, self.next_sync = generation, time.monotonic() + _sync_seconds()
+        for row_id, jti in rows:
+            self.add(jti)
+            self.last_id = max(self.last_id, row_id)
+
+    def add(self, jti):
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+            self.exact[jti] = True
+
+    def forget(self, jti):
+        # un-blacklisted (admin): the filter cannot drop it, the next probable hit asks the database
+        with self.lock:
+            self.exact.pop(jti, None)
+
+    def contains(self, jti):
+        self.sync()
+        if jti not in self.filter:
+            return False
+        if jti in self.exact:
+            return self.exact[jti]
+
+        found = self._tokens().filter(token__jti=jti).exists()
+        with self.lock:
+            if len(self.exact) >= self.exact_size:
+                # oldest first
+                del self.exact[next(iter(self.exact))]
+            self.exact[jti] = found
+        return found
+
+
+blacklist = JtiBlacklist.from_settings()
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+# conditional GET for polled endpoints: the view derives a cheap version token first and
+# answers If-None-Match with a 304 before building the body.
+#
+# ETag only, no Last-Modified: a timestamp only ever moves forward, so it cannot tell that a post
+# left the feed or that a username changed, and a client revalidating with If-Modified-Since
+# alone would be told its stale copy is current.
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest())
+
+
+def not_modified(request, etag):
+    """The 304 (or 412) response if the client's copy is current, else None. No etag, no validation."""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    return set_validators(response, etag) if response is not None else None
+
+
+def set_validators(response, etag):
+    if etag is None:
+        return response
+    response["ETag"] = etag
+    # per-user data: browsers may keep it but must revalidate, shared caches must not
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
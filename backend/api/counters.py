@@ -0,0 +1,39 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, CommentReaction, Post, PostReaction
+
+
+def bump(model, pk, field, delta):
+    """Atomic `field = field + delta` on one row, never going below 0. Also moves updated_at if the model has one."""
+    changes = {field: Greatest(F(field) + delta, Value(0))}
+    if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+        changes["updated_at"] = timezone.now()
+    model.objects.filter(pk=pk).update(**changes)
+
+
+def _count_of(model, fk):
+    rows = model.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(n=Count("pk")).values("n")
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+# (model, counter field, related model, its foreign key back to model)
+COUNTERS = [
+    (Post, "reactions_count", PostReaction, "post"),
+    (Post, "comments_count", Comment, "post"),
+    (Comment, "reactions_count", CommentReaction, "comment"),
+    (Comment, "replies_count", Comment, "parent_comment"),
+]
+
+
+def reconcile(dry_run=False):
+    """Recounts every denormalized counter from the source rows. Returns {"post.reactions_count": drifted rows}."""
+    drift = {}
+    for model, field, related, fk in COUNTERS:
+        actual = _count_of(related, fk)
+        drifted = model.objects.annotate(actual=actual).exclude(**{field: F("actual")})
+        drift[f"{model._meta.db_table}.{field}"] = drifted.count()
+        if not dry_run and drift[f"{model._meta.db_table}.{field}"]:
+            model.objects.filter(pk__in=drifted.values("pk")).update(**{field: _count_of(related, fk)})
+    return drift
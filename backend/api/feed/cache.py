@@ -0,0 +1,68 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import FeedEntry
+
+# every user has a generation token; cached pages are keyed by it, so bumping the
+# token invalidates all of that user's pages (any limit, any cursor) in one write
+
+HITS_KEY = "feed:stats:hits"
+MISSES_KEY = "feed:stats:misses"
+
+
+def _ttl():
+    return getattr(settings, "FEED_CACHE_TTL", 30)
+
+
+def _generation_key(user_id):
+    return f"feed:gen:{user_id}"
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # first event since the counter expired / the cache was cleared
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def page_key(user_id, limit, cursor):
+    generation = cache.get(_generation_key(user_id))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(_generation_key(user_id), generation, timeout=None)
+    return f"feed:page:{user_id}:{generation}:{limit}:{cursor or ''}"
+
+
+def get_page(key):
+    payload = cache.get(key)
+    _count(MISSES_KEY if payload is None else HITS_KEY)
+    return payload
+
+
+def set_page(key, payload):
+    cache.set(key, payload, timeout=_ttl())
+
+
+def invalidate_users(user_ids):
+    user_ids = set(user_ids)
+    if user_ids:
+        generation = uuid.uuid4().hex
+        cache.set_many({_generation_key(user_id): generation for user_id in user_ids}, timeout=None)
+
+
+def invalidate_post_readers(post_id):
+    """Invalidates every user who has the post in their feed."""
+    invalidate_users(FeedEntry.objects.filter(post_id=post_id).values_list("user_id", flat=True))
+
+
+def stats(reset=False):
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    if reset:
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Post
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _recent(qs, since, limit):
+    return list(qs.filter(created_at__gte=since).order_by("-created_at").values_list("post_id", flat=True)[:limit])
+
+
+def gather_candidates(sources, now=None):
+    """
+    Collects the ids of the posts worth scoring for a user, so ranking cost depends on the
+    user's fan-in and not on the size of the post table. Every source is its own bounded query
+    on a (column, created_at) index:
+
+    - the user's university page, communities and followed pages, over FEED_CANDIDATE_WINDOW_DAYS
+    - the user's own posts, over the same window (fan-out puts them in the author's feed too)
+    - everything posted in the last FEED_GLOBAL_WINDOW_HOURS (older posts get no freshness
+      points, so without an affinity they can't rank)
+    """
+    now = now or timezone.now()
+    per_source = _setting("FEED_CANDIDATES_PER_SOURCE", 200)
+    since = now - timedelta(days=_setting("FEED_CANDIDATE_WINDOW_DAYS", 14))
+
+    ids = set()
+    if sources.uni_page_id:
+        ids.update(_recent(Post.objects.filter(author_page_id=sources.uni_page_id), since, per_source))
+    if sources.community_ids:
+        ids.update(_recent(Post.objects.filter(community_id__in=sources.community_ids), since, per_source))
+    if sources.followed_page_ids:
+        ids.update(_recent(Post.objects.filter(author_page_id__in=sources.followed_page_ids), since, per_source))
+    if sources.user_id:
+        ids.update(_recent(Post.objects.filter(author_user_id=sources.user_id), since, per_source))
+
+    global_since = now - timedelta(hours=_setting("FEED_GLOBAL_WINDOW_HOURS", 72))
+    ids.update(_recent(Post.objects.all(), global_since, _setting("FEED_GLOBAL_CANDIDATES", 300)))
+
+    return ids
@@ -0,0 +1,41 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(score, created_at, post_id, as_of):
+    """`as_of` is the time the first page was ranked at; the next pages rank as of it too, so posts do not
+    move between pages when they cross a freshness step."""
+    raw = json.dumps([score, created_at.isoformat(), post_id, as_of.isoformat()], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Returns (score, created_at, post_id, as_of)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        score, created_at, post_id, as_of = json.loads(raw)
+        created_at, as_of = parse_datetime(created_at), parse_datetime(as_of)
+        if created_at is None or as_of is None:
+            raise ValueError(token)
+        return int(score), created_at, int(post_id), as_of
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(token) from e
+
+
+def after_cursor(score, created_at, post_id):
+    """
+    Filter for the rows that come after (score, created_at, post_id) in "-score, -created_at, -post_id" order,
+    `score` being the rank annotated by the feed view. Expanded by hand because the ORM has no row-value comparison.
+    """
+    return (
+        Q(score__lt=score)
+        | Q(score=score, created_at__lt=created_at)
+        | Q(score=score, created_at=created_at, post_id__lt=post_id)
+    )
@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from ..authentication import invalidate_user
+from ..models import (
+    CommunityMember,
+    FeedEntry,
+    FollowPage,
+    Instructor,
+    Post,
+    Student,
+    UserProfile,
+)
+from .candidates import gather_candidates
+from .ranking import rank
+from .scoring import feed_rank, get_user_sources, get_weights
+
+
+def _max_entries():
+    return getattr(settings, "FEED_MAX_ENTRIES", 500)
+
+
+def _batch_size():
+    return getattr(settings, "FEED_FANOUT_BATCH_SIZE", 1000)
+
+
+def get_post_recipients(post, weights):
+    """Returns {user_id: affinity points} for every user whose feed should receive this post."""
+    recipients = {}
+
+    def add(user_ids, points):
+        for user_id in user_ids:
+            recipients[user_id] = recipients.get(user_id, 0) + points
+
+    if post.author_page_id:
+        # the post is written by a university page -> its students and instructors
+        add(
+            Student.objects.filter(university_page_id=post.author_page_id).values_list("user_id", flat=True),
+            weights.university,
+        )
+        add(
+            Instructor.objects.filter(university_page_id=post.author_page_id).values_list("user_id", flat=True),
+            weights.university,
+        )
+        add(FollowPage.objects.filter(page_id=post.author_page_id).values_list("user_id", flat=True), weights.following)
+
+    if post.community_id:
+        add(
+            CommunityMember.objects.filter(community_id=post.community_id).values_list("user_id", flat=True),
+            weights.community,
+        )
+
+    # authors always see their own posts
+    if post.author_user_id:
+        add([post.author_user_id], 0)
+
+    return recipients
+
+
+def fan_out_post(post):
+    """Writes a feed entry for `post` into the feed of each of its recipients, returns their ids."""
+    entries = [
+        FeedEntry(user_id=user_id, post_id=post.post_id, affinity=points, created_at=post.created_at)
+        for user_id, points in get_post_recipients(post, get_weights()).items()
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=_batch_size(), ignore_conflicts=True)
+    user_ids = [e.user_id for e in entries]
+    trim_feeds(user_ids)
+    return user_ids
+
+
+def trim_feeds(user_ids):
+    """
+    Deletes, from each of these feeds that grew past FEED_MAX_ENTRIES rows, the entries that rank
+    below that limit right now, so feed reads never rank more rows than a rebuild would keep.
+    """
+    limit, weights, now, size = _max_entries(), get_weights(), timezone.now(), _batch_size()
+    for batch in (user_ids[i : i + size] for i in range(0, len(user_ids), size)):  # noqa: E203
+        full = list(
+            FeedEntry.objects.filter(user_id__in=batch)
+            .values("user_id")
+            .annotate(entries=Count("id"))
+            .filter(entries__gt=limit)
+            .values_list("user_id", flat=True)
+        )
+        if not full:
+            continue
+
+        overflow = list(
+            FeedEntry.objects.filter(user_id__in=full)
+            .annotate(
+                score=feed_rank(weights, now),
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F("user_id")],
+                    order_by=[F("score").desc(), F("created_at").desc(), F("post_id").desc()],
+                ),
+            )
+            .filter(position__gt=limit)
+            .values_list("id", flat=True)
+        )
+        FeedEntry.objects.filter(id__in=overflow).delete()
+
+
+def rebuild_user_feed(user):
+    """
+    Recomputes the feed of one user from its candidate posts and applies only the difference to
+    feed_entry: rows for posts that dropped out are deleted, new ones inserted, changed affinities updated.
+    Which posts are kept depends on their score now; only their affinity is stored, engagement and
+    freshness are added when the feed is read (scoring.feed_rank). Marks the profile as rebuilt.
+    """
+    # taken before the sources are read: a community joined while this runs leaves the feed stale
+    started = timezone.now()
+    sources = get_user_sources(user)
+    candidates = Post.objects.filter(post_id__in=gather_candidates(sources))
+    ranked = rank(candidates, sources, get_weights(), k=_max_entries())
+    wanted = {r.post_id: (r.affinity, r.created_at) for r in ranked}
+
+    current = {e.post_id: e for e in FeedEntry.objects.filter(user=user).only("id", "post_id", "affinity")}
+
+    to_delete = [e.id for post_id, e in current.items() if post_id not in wanted]
+    to_create = []
+    to_update = []
+    for post_id, (affinity, created_at) in wanted.items():
+        entry = current.get(post_id)
+        if entry is None:
+            to_create.append(FeedEntry(user=user, post_id=post_id, affinity=affinity, created_at=created_at))
+        elif entry.affinity != affinity:
+            entry.affinity = affinity
+            to_update.append(entry)
+
+    with transaction.atomic():
+        if to_delete:
+            FeedEntry.objects.filter(id__in=to_delete).delete()
+        FeedEntry.objects.bulk_create(to_create, batch_size=_batch_size(), ignore_conflicts=True)
+        FeedEntry.objects.bulk_update(to_update, ["affinity"], batch_size=_batch_size())
+        # no save(): updated_at (auth/me's ETag) stays, the cached user is dropped by hand
+        UserProfile.objects.filter(user=user).update(feed_rebuilt_at=started)
+        transaction.on_commit(lambda: invalidate_user(user.pk))
+
+    return len(to_create), len(to_update), len(to_delete)
@@ -0,0 +1,103 @@
+from django.core.files.storage import default_storage
+
+from ..models import Post, PostMedia
+
+# builds feed items straight from .values() rows: a fixed 2 queries per page
+# (posts with author/profile/page joined in, then all their media), no model instances
+
+POST_FIELDS = (
+    "post_id",
+    "content_text",
+    "post_type",
+    "created_at",
+    "reactions_count",
+    "comments_count",
+    "author_user_id",
+    "author_user__username",
+    "author_user__profile__profile_image",
+    "author_page_id",
+    "author_page__page_name",
+    "author_page__page_type",
+)
+
+
+class UrlBuilder:
+    """Turns stored file names / urls into absolute urls, resolving the request origin only once."""
+
+    def __init__(self, request):
+        self.origin = request.build_absolute_uri("/").rstrip("/")
+
+    def absolute(self, url):
+        return self.origin + url if url.startswith("/") else url
+
+    def file(self, name):
+        return self.absolute(default_storage.url(name)) if name else None
+
+    def url(self, url):
+        return self.absolute(url) if url else None
+
+
+def _media_rows(post_ids):
+    rows = PostMedia.objects.filter(post_id__in=post_ids).order_by("post_id", "order_index")
+    return rows.values("post_id", "media_type", "media_file", "media_url")
+
+
+def _post_rows(post_ids):
+    return Post.objects.filter(post_id__in=post_ids).values(*POST_FIELDS)
+
+
+async def aproject_posts(request, post_ids):
+    """Returns the feed items for `post_ids`, in that order."""
+    media_rows = [m async for m in _media_rows(post_ids)]
+    post_rows = [p async for p in _post_rows(post_ids)]
+    return build_items(UrlBuilder(request), post_ids, media_rows, post_rows)
+
+
+def build_items(urls, post_ids, media_rows, post_rows):
+    media = {}
+    for m in media_rows:
+        media.setdefault(m["post_id"], []).append(
+            {
+                "type": (m["media_type"] or "").lower(),
+                "url": urls.file(m["media_file"]) or urls.url(m["media_url"]),
+            }
+        )
+
+    posts = {p["post_id"]: p for p in post_rows}
+
+    items = []
+    for post_id in post_ids:
+        p = posts.get(post_id)
+        if p is None:
+            continue
+
+        author_username = None
+        author_avatar = None
+        author_tag = None
+
+        if p["author_user_id"]:
+            author_username = p["author_user__username"]
+            author_avatar = urls.file(p["author_user__profile__profile_image"])
+
+        if p["author_page_id"]:
+            # pages have no avatar yet
+            author_username = p["author_page__page_name"]
+            author_tag = p["author_page__page_type"]
+            author_avatar = None
+
+        items.append(
+            {
+                "id": post_id,
+                "content": p["content_text"],
+                "post_type": p["post_type"],
+                "created_at": p["created_at"],
+                "author_username": author_username,
+                "author_avatar": author_avatar,
+                "tag": author_tag,
+                "media": media.get(post_id, []),
+                "likes_count": p["reactions_count"],
+                "comments_count": p["comments_count"],
+            }
+        )
+
+    return items
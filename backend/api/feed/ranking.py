@@ -0,0 +1,142 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import numpy as np
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+# in-process feed ranking: candidate posts are loaded once as NumPy columns, scored with the
+# weights from api/feed/scoring.py in one vectorized pass, and only the top k get sorted
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MISSING = -1
+
+CandidateArrays = namedtuple(
+    "CandidateArrays", ["post_id", "author_page_id", "community_id", "reactions", "comments", "created_us"]
+)
+
+# score: what the post ranks by now; affinity: its time- and engagement-independent part (feed_entry.affinity)
+RankedPost = namedtuple("RankedPost", ["post_id", "score", "affinity", "created_at"])
+
+
+def _to_us(dt):
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, dt_timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_us(us):
+    return EPOCH + timedelta(microseconds=int(us))
+
+
+def _int_column(values, missing=None):
+    if missing is None:
+        return np.array(values, dtype=np.int64)
+    # None -> nan -> missing, ids stay exact up to 2**53
+    return np.nan_to_num(np.array(values, dtype=np.float64), nan=missing).astype(np.int64)
+
+
+def _datetime_column(values):
+    if values and isinstance(values[0], datetime):
+        return np.fromiter((_to_us(v) for v in values), dtype=np.int64, count=len(values))
+    # stored UTC text, NumPy parses it in C
+    return np.array(values, dtype="datetime64[us]").astype(np.int64)
+
+
+def load_candidates(qs):
+    """
+    Reads the columns the ranking needs from a Post queryset into NumPy arrays.
+    Rows come straight from the DB cursor: no model instances and no per-value ORM converters.
+    """
+    created_at = "created_at"
+    if connections[qs.db].vendor == "sqlite":
+        # building datetime objects costs ~40x more than letting NumPy parse the text column
+        qs = qs.annotate(created_text=Cast("created_at", TextField()))
+        created_at = "created_text"
+
+    rows = qs.values_list("post_id", "author_page_id", "community_id", "reactions_count", "comments_count", created_at)
+    try:
+        sql, params = rows.query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. post_id__in=[] for a user with no candidates: the ORM would return [] without a query
+        sql = None
+    if sql is None:
+        columns = [()] * 6
+    else:
+        with connections[rows.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            columns = list(zip(*cursor.fetchall())) or [()] * 6
+
+    return CandidateArrays(
+        post_id=_int_column(columns[0]),
+        author_page_id=_int_column(columns[1], MISSING),
+        community_id=_int_column(columns[2], MISSING),
+        reactions=_int_column(columns[3]),
+        comments=_int_column(columns[4]),
+        created_us=_datetime_column(columns[5]),
+    )
+
+
+def affinity(candidates, sources, weights):
+    """The points a post gets from where it comes from, the same whenever the feed is read."""
+    points = np.zeros(len(candidates.post_id), dtype=np.int64)
+    if sources.uni_page_id:
+        points += np.where(candidates.author_page_id == sources.uni_page_id, weights.university, 0)
+    if sources.community_ids:
+        points += np.where(np.isin(candidates.community_id, sources.community_ids), weights.community, 0)
+    if sources.followed_page_ids:
+        points += np.where(np.isin(candidates.author_page_id, sources.followed_page_ids), weights.following, 0)
+    return points
+
+
+def score(candidates, sources, weights, now=None, affinities=None):
+    now_us = _to_us(now or timezone.now())
+
+    points = (affinity(candidates, sources, weights) if affinities is None else affinities).copy()
+
+    engagement = candidates.reactions * weights.reaction + candidates.comments * weights.comment
+    points += np.minimum(engagement, weights.engagement_cap)
+
+    # freshness steps are checked from the widest to the narrowest so the narrowest one wins
+    age_us = now_us - candidates.created_us
+    fresh = np.zeros_like(points)
+    for max_age, step_points in reversed(weights.freshness):
+        fresh = np.where(age_us <= max_age // timedelta(microseconds=1), step_points, fresh)
+    points += fresh
+
+    return points
+
+
+def top_k(candidates, scores, k):
+    """
+    Indices of the k best candidates in feed order (-score, -created_at, -post_id).
+    argpartition finds the k-th best score in O(n); only rows at or above it are fully sorted,
+    which keeps ties on that boundary ordered exactly like the SQL version.
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < n:
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        idx = np.flatnonzero(scores >= kth)
+    else:
+        idx = np.arange(n)
+
+    order = np.lexsort((-candidates.post_id[idx], -candidates.created_us[idx], -scores[idx]))
+    return idx[order][:k]
+
+
+def rank(qs, sources, weights, k, now=None):
+    """Scores the posts of `qs` for one user and returns the k best as RankedPost tuples, best first."""
+    candidates = load_candidates(qs)
+    affinities = affinity(candidates, sources, weights)
+    scores = score(candidates, sources, weights, now=now, affinities=affinities)
+    return [
+        RankedPost(int(candidates.post_id[i]), int(scores[i]), int(affinities[i]), _from_us(candidates.created_us[i]))
+        for i in top_k(candidates, scores, k)
+    ]
@@ -0,0 +1,126 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import ExpressionWrapper
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from ..models import CommunityMember, FollowPage
+
+# default feed weights, each key can be overridden from settings.FEED_WEIGHTS
+DEFAULT_WEIGHTS = {
+    # points given to a post depending on where it comes from
+    "UNIVERSITY": 50,
+    "COMMUNITY": 30,
+    "FOLLOWING": 20,
+    # engagement = reactions * REACTION + comments * COMMENT, capped
+    "REACTION": 2,
+    "COMMENT": 1,
+    "ENGAGEMENT_CAP": 20,
+    # (max age in hours, points) checked in order, anything older gets 0
+    "FRESHNESS": ((6, 20), (24, 10), (72, 5)),
+}
+
+FeedWeights = namedtuple(
+    "FeedWeights", ["university", "community", "following", "reaction", "comment", "engagement_cap", "freshness"]
+)
+
+FeedSources = namedtuple("FeedSources", ["uni_page_id", "community_ids", "followed_page_ids", "user_id"])
+
+
+def get_user_university_page_id(user):
+    student = getattr(user, "student_profile", None)
+    if student and student.university_page_id:
+        return student.university_page_id
+
+    instructor = getattr(user, "instructor_profile", None)
+    if instructor and instructor.university_page_id:
+        return instructor.university_page_id
+
+    return None
+
+
+def get_user_sources(user):
+    return FeedSources(
+        uni_page_id=get_user_university_page_id(user),
+        community_ids=list(CommunityMember.objects.filter(user=user).values_list("community_id", flat=True)),
+        followed_page_ids=list(FollowPage.objects.filter(user=user).values_list("page_id", flat=True)),
+        user_id=user.pk,
+    )
+
+
+def get_weights():
+    w = {**DEFAULT_WEIGHTS, **getattr(settings, "FEED_WEIGHTS", {})}
+    return FeedWeights(
+        university=w["UNIVERSITY"],
+        community=w["COMMUNITY"],
+        following=w["FOLLOWING"],
+        reaction=w["REACTION"],
+        comment=w["COMMENT"],
+        engagement_cap=w["ENGAGEMENT_CAP"],
+        freshness=tuple((timedelta(hours=hours), points) for hours, points in w["FRESHNESS"]),
+    )
+
+
+# The score formula, in SQL: feed_rank() scores feed_entry rows when a feed is read, annotate_scores()
+# the same way from Post rows. api/feed/ranking.py is its NumPy twin (tested against annotate_scores).
+
+
+def engagement(weights, prefix=""):
+    """min(reactions * REACTION + comments * COMMENT, ENGAGEMENT_CAP) of the post at `prefix`."""
+    return Least(
+        F(f"{prefix}reactions_count") * Value(weights.reaction) + F(f"{prefix}comments_count") * Value(weights.comment),
+        Value(weights.engagement_cap),
+    )
+
+
+def freshness(weights, as_of):
+    """The points of the first FRESHNESS step `created_at` is within, as of `as_of`."""
+    return Case(
+        # narrowest step first, the first match wins
+        *[When(created_at__gte=as_of - max_age, then=Value(points)) for max_age, points in weights.freshness],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def feed_rank(weights, as_of):
+    """
+    The score of a feed_entry row as of `as_of`: its stored affinity plus the post's engagement and
+    freshness, which change after the entry is written and so are computed when the feed is read.
+    """
+    return ExpressionWrapper(
+        F("affinity") + engagement(weights, "post__") + freshness(weights, as_of), output_field=IntegerField()
+    )
+
+
+def affinity(sources, weights):
+    """The points a Post gets from where it comes from, what feed_entry.affinity stores."""
+
+    def points(condition, value):
+        return Case(When(condition, then=Value(value)), default=Value(0), output_field=IntegerField())
+
+    # a missing source scores nothing (author_page_id=None would match every user's post)
+    total = Value(0)
+    if sources.uni_page_id:
+        total += points(Q(author_page_id=sources.uni_page_id), weights.university)
+    if sources.community_ids:
+        total += points(Q(community_id__in=sources.community_ids), weights.community)
+    if sources.followed_page_ids:
+        total += points(Q(author_page_id__in=sources.followed_page_ids), weights.following)
+    return total
+
+
+def annotate_scores(qs, sources, weights, as_of=None):
+    """
+    Adds the feed `score` to a Post queryset, evaluated row by row by the database. This is the
+    reference implementation of api/feed/ranking.py, used by the bench_ranking command and the tests.
+    """
+    as_of = as_of or timezone.now()
+    return qs.annotate(
+        score=ExpressionWrapper(
+            affinity(sources, weights) + engagement(weights) + freshness(weights, as_of), output_field=IntegerField()
+        )
+    )
@@ -0,0 +1,32 @@
+from django.db.models import Count, Max, Q, Sum
+
+from ..conditional import make_etag
+from ..models import FeedEntry
+from .scoring import get_weights
+
+
+def _version(as_of):
+    version = {
+        "entries": Count("pk"),
+        "posts": Sum("post_id"),
+        "affinities": Sum("affinity"),
+        "updated": Max("post__updated_at"),
+    }
+    # how many posts are in each freshness step: ranks move when a post steps down
+    for i, (max_age, _) in enumerate(get_weights().freshness):
+        version[f"fresh_{i}"] = Count("pk", filter=Q(created_at__gte=as_of - max_age))
+    return version
+
+
+async def afeed_version(user_id, limit, cursor, as_of):
+    """The etag of one feed page ranked as of `as_of`, from a single aggregate over the user's feed
+    entries.
+
+    Entries coming or going change the count/sums, a rebuild changes the affinity sum, a post edit,
+    reaction or comment moves post.updated_at, and a post getting older than a freshness step moves
+    that step's count. Returns None for an empty feed.
+    """
+    version = await FeedEntry.objects.filter(user_id=user_id).aaggregate(**_version(as_of))
+    if not version["entries"]:
+        return None
+    return make_etag(user_id, limit, cursor, *sorted(version.items()))
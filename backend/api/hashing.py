@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import backends, hashers
+
+from .metrics import registry
+
+# PBKDF2 runs for ~0.4 s a password. Done on the request thread, a burst of logins holds every worker
+# and the feed queues behind it. Hashing and verification run here instead, on a few threads
+# (hashlib releases the GIL, so they really run in parallel) with a bounded queue in front: when
+# it is full, PoolBusy is raised at once and the views answer 429 instead of everything slowing down.
+
+
+class PoolBusy(Exception):
+    """Every hashing thread is busy and the queue in front of them is full."""
+
+
+class HashingPool:
+    def __init__(self, workers=1, max_queue=4):
+        # workers=0 hashes on the calling thread, unbounded: the behaviour before the pool
+        self.workers = workers
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hashing") if workers else None
+        self.admitted = 0
+        self.running = 0
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.PASSWORD_HASHING
+        return cls(options["WORKERS"], options["MAX_QUEUE"])
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            registry.inc(
+                "campus_password_hashing_rejected_total",
+                "Hashing jobs refused because the pool was full.",
+                op=fn.__name__,
+            )
+            raise PoolBusy
+        with self.lock:
+            self.admitted += 1
+        future = self.executor.submit(self._call, fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        if not self.workers:
+            return await sync_to_async(fn, thread_sensitive=False)(*args)
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _call(self, fn, *args):
+        with self.lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def _done(self, future):
+        with self.lock:
+            self.admitted -= 1
+        self.slots.release()
+
+    @property
+    def queued(self):
+        return self.admitted - self.running
+
+
+def make_password(raw_password):
+    return pool.run(hashers.make_password, raw_password)
+
+
+def _upgrade(user, raw_password):
+    # the hasher or its iteration count changed since the password was set, as User.check_password does
+    user.password = make_password(raw_password)
+    user._password = None
+    user.save(update_fields=["password"])
+
+
+def check_password(user, raw_password):
+    """User.check_password with the hashing done on the pool."""
+    correct, must_update = pool.run(hashers.verify_password, raw_password, user.password)
+    if correct and must_update:
+        _upgrade(user, raw_password)
+    return correct
+
+
+async def acheck_password(user, raw_password):
+    correct, must_update = await pool.arun(hashers.verify_password, raw_password, user.password)
+    if correct and must_update:
+        await sync_to_async(_upgrade)(user, raw_password)
+    return correct
+
+
+class PooledModelBackend(backends.ModelBackend):
+    """Django's ModelBackend, hashing on the pool. PoolBusy goes through authenticate() to the view."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(backends.UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = backends.UserModel._default_manager.get_by_natural_key(username)
+        except backends.UserModel.DoesNotExist:
+            # hash anyway, so a missing user takes as long as a wrong password (Django #20760)
+            make_password(password)
+        else:
+            if check_password(user, password) and self.user_can_authenticate(user):
+                return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(backends.UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = await backends.UserModel._default_manager.aget_by_natural_key(username)
+        except backends.UserModel.DoesNotExist:
+            await pool.arun(hashers.make_password, password)
+        else:
+            if await acheck_password(user, password) and self.user_can_authenticate(user):
+                return user
+
+
+pool = HashingPool.from_settings()
+registry.gauge("campus_password_hashing_queued", "Password hashing jobs waiting for a thread.", lambda: pool.queued)
+registry.gauge("campus_password_hashing_running", "Password hashing jobs running.", lambda: pool.running)
@@ -0,0 +1,179 @@
+import contextlib
+import io
+import json
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ...feed import cache as feed_cache
+from ...models import EmailVerification, Post, UniversityDomain
+from .seed_campus import SEED_PASSWORD, letters
+
+User = get_user_model()
+
+ENDPOINTS = ["feed", "feed_cached", "me", "login", "signup"]
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "mean_ms", "queries_mean", "queries_max"]
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(sorted_values, p):
+    # nearest rank
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, queries, errors):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "queries_mean": round(sum(queries) / len(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the feed, me, login and signup endpoints in-process against the current (seeded) database and "
+        "reports p50/p95/p99 latency and DB queries per request. Writes are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+        parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"any of {','.join(ENDPOINTS)}")
+        parser.add_argument("--prefix", default="seed", help="username prefix used by seed_campus")
+        parser.add_argument("--output", help="write the results to this JSON file")
+        parser.add_argument("--compare", help="JSON file of an earlier run to diff against")
+
+    def handle(self, *args, **options):
+        endpoints = [e for e in options["endpoints"].split(",") if e]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+        self.users = list(
+            User.objects.filter(username__startswith=options["prefix"], is_active=True)
+            .order_by("id")
+            .values_list("id", "username")[:500]
+        )
+        if not self.users:
+            raise CommandError("no seeded users found, run seed_campus first")
+        self.prefix = options["prefix"]
+        self.client = Client(HTTP_HOST="localhost")
+        self.tokens = {user_id: str(AccessToken.for_user(User(id=user_id))) for user_id, _ in self.users}
+
+        results = {
+            "meta": {
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+                "posts": Post.objects.count(),
+                "users": User.objects.count(),
+                "requests_per_endpoint": options["requests"],
+            },
+            "endpoints": {},
+        }
+
+        try:
+            # the endpoints are measured, not their throttles (every request comes from one address)
+            with override_settings(THROTTLES={}), transaction.atomic():
+                for name in endpoints:
+                    results["endpoints"][name] = self.run(name, options["requests"])
+                    self.report(name, results["endpoints"][name])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self.compare(json.load(f), results)
+
+    def run(self, name, count):
+        prepare = getattr(self, f"prepare_{name}")
+        send, path, kwargs = prepare(0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            send(path, **kwargs)  # warm up imports, caches and connections
+
+        latencies, queries, errors = [], [], 0
+        for i in range(1, count + 1):
+            send, path, kwargs = prepare(i)
+            with CaptureQueriesContext(connection) as ctx, contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                response = send(path, **kwargs)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+            if response.status_code >= 400:
+                errors += 1
+        return summarize(latencies, queries, errors)
+
+    def user(self, i):
+        return self.users[i % len(self.users)]
+
+    def auth(self, user_id):
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[user_id]}"}
+
+    # each prepare_* does the untimed setup of request i and returns (client method, path, kwargs)
+
+    def prepare_feed(self, i):
+        user_id, _ = self.user(i)
+        feed_cache.invalidate_users([user_id])
+        return self.client.get, "/api/posts/feed/", {"data": {"limit": 20}, **self.auth(user_id)}
+
+    def prepare_feed_cached(self, i):
+        user_id, _ = self.user(i % 10)
+        return self.client.get, "/api/posts/feed/", {"data": {"limit": 20}, **self.auth(user_id)}
+
+    def prepare_me(self, i):
+        user_id, _ = self.user(i)
+        return self.client.get, "/api/auth/me/", self.auth(user_id)
+
+    def prepare_login(self, i):
+        _, username = self.user(i)
+        body = {"username": username, "password": SEED_PASSWORD}
+        return self.client.post, "/api/auth/login/", {"data": body, "content_type": "application/json"}
+
+    def prepare_signup(self, i):
+        domain = UniversityDomain.objects.filter(domain__startswith="students.", is_active=True).first()
+        if domain is None:
+            raise CommandError("no students.* university domain, run seed_campus first")
+        username = f"{self.prefix}bench{letters(i)}"
+        email = f"{username}@{domain.domain}"
+        v = EmailVerification(username=username, academic_email=email, code="000000", is_verified=True)
+        v.set_expiry()
+        v.save()
+        body = {"username": username, "academicEmail": email, "personalEmail": "", "password": SEED_PASSWORD}
+        return self.client.post, "/api/auth/signup/", {"data": body, "content_type": "application/json"}
+
+    def report(self, name, r):
+        self.stdout.write(
+            f"{name:<12} p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  "
+            f"queries {r['queries_mean']:>5.1f} (max {r['queries_max']})  errors {r['errors']}"
+        )
+
+    def compare(self, before, after):
+        self.stdout.write(f"\ncompared with {before['meta']['started_at']}:")
+        for name, now in after["endpoints"].items():
+            then = before["endpoints"].get(name)
+            if not then:
+                continue
+            deltas = []
+            for metric in METRICS:
+                change = (now[metric] - then[metric]) / then[metric] * 100 if then[metric] else 0.0
+                deltas.append(f"{metric} {then[metric]} -> {now[metric]} ({change:+.0f}%)")
+            self.stdout.write(f"{name:<12} " + ", ".join(deltas))
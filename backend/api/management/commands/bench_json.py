@@ -0,0 +1,114 @@
+import io
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ... import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def feed_payload(rnd, items):
+    """A feed page shaped like the real one: datetimes as the database returns them, 0-4 media per post."""
+    now = timezone.now()
+    results = []
+    for i in range(items):
+        results.append(
+            {
+                "id": 100000 + i,
+                "content": " ".join(
+                    rnd.choice(["exam", "lab", "café", "today", "مرحبا", "room", "12:30"]) for _ in range(30)
+                ),
+                "post_type": rnd.choice(["normal", "announcement"]),
+                "created_at": now - timedelta(seconds=rnd.randrange(86400 * 14), microseconds=rnd.randrange(10**6)),
+                "author_username": f"user{i}",
+                "author_avatar": f"http://localhost:8000/media/profiles/user{i}.png",
+                "tag": rnd.choice([None, "university", "student_club"]),
+                "media": [
+                    {"type": rnd.choice(["image", "url"]), "url": f"https://picsum.photos/seed/{i}-{m}/600"}
+                    for m in range(rnd.choice([0, 0, 1, 2, 4]))
+                ],
+                "likes_count": rnd.randrange(5000),
+                "comments_count": rnd.randrange(300),
+            }
+        )
+    return {"results": results, "next_cursor": "WzEyLCIyMDI2LTEwLTE4VDEwOjAwOjAwKzAwOjAwIiwxMDAwNDld"}
+
+
+def _best_of(repeat, number, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = (time.perf_counter() - started) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark of the API's JSON encoding and decoding on feed-sized payloads: the orjson renderer and "
+        "parser, their stdlib fallback, DRF's JSONRenderer/JSONParser and django.http.JsonResponse's encoder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", default="20,50", help="comma separated feed page sizes")
+        parser.add_argument("--number", type=int, default=200, help="calls per timing run")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        drf_renderer, drf_parser = JSONRenderer(), JSONParser()
+        fast_renderer, fast_parser = renderers.FastJSONRenderer(), renderers.FastJSONParser()
+
+        self.stdout.write(f"orjson: {orjson.__version__ if orjson else 'not installed, fast = stdlib fallback'}")
+        self.stdout.write(f"{'items':>6} {'bytes':>8} {'encoder':<22} {'dump us':>9} {'load us':>9} {'MB/s':>7}")
+        for items in [int(n) for n in options["items"].split(",") if n]:
+            payload = feed_payload(rnd, items)
+            # what the views handed to the encoders before: datetimes already turned into strings
+            legacy = {
+                **payload,
+                "results": [{**p, "created_at": p["created_at"].isoformat()} for p in payload["results"]],
+            }
+            body = renderers.dumps(payload)
+            encoders = [
+                (
+                    "fast (api.renderers)",
+                    lambda: fast_renderer.render(payload),
+                    lambda: fast_parser.parse(io.BytesIO(body)),
+                ),
+                (
+                    "stdlib fallback",
+                    lambda: renderers.stdlib_dumps(payload),
+                    lambda: json.loads(body),
+                ),
+                (
+                    "drf JSONRenderer",
+                    lambda: drf_renderer.render(legacy),
+                    lambda: drf_parser.parse(io.BytesIO(body)),
+                ),
+                (
+                    "django JsonResponse",
+                    lambda: json.dumps(legacy, cls=DjangoJSONEncoder).encode(),
+                    lambda: json.loads(body),
+                ),
+            ]
+            for name, dump, load in encoders:
+                dump_us = _best_of(options["repeat"], options["number"], dump)
+                load_us = _best_of(options["repeat"], options["number"], load)
+                self.stdout.write(
+                    f"{items:>6} {len(body):>8} {name:<22} {dump_us:>9.1f} {load_us:>9.1f} "
+                    f"{len(body) / dump_us:>7.0f}"
+                )
@@ -0,0 +1,117 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ... import hashing
+from .bench_api import percentile
+from .seed_campus import SEED_PASSWORD
+
+User = get_user_model()
+
+MODES = ["inline", "pooled"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start-of-semester login storm: --logins clients post to /api/auth/login/ as fast as they can while "
+        "--readers clients load their feed. Runs once hashing on the request thread (inline) and once on a "
+        "bounded HashingPool (pooled), and reports logins/s, 429s and the feed's latency under the storm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=16, help="concurrent login clients")
+        parser.add_argument("--readers", type=int, default=2, help="concurrent feed clients")
+        parser.add_argument("--seconds", type=float, default=10.0, help="duration of each mode's run")
+        parser.add_argument("--workers", type=int, default=hashing.pool.workers or 1, help="pooled mode's threads")
+        parser.add_argument("--max-queue", type=int, default=hashing.pool.max_queue, help="pooled mode's queue")
+        parser.add_argument("--modes", default=",".join(MODES), help=f"any of {','.join(MODES)}")
+        parser.add_argument("--prefix", default="seed", help="username prefix used by seed_campus")
+
+    def handle(self, *args, **options):
+        self.users = list(
+            User.objects.filter(username__startswith=options["prefix"], is_active=True)
+            .order_by("id")
+            .values_list("id", "username")[:500]
+        )
+        if len(self.users) < options["logins"] + options["readers"]:
+            raise CommandError("not enough seeded users, run seed_campus first")
+
+        self.stdout.write(
+            f"{'mode':<7} {'logins/s':>9} {'429s':>6} {'login p50':>10} {'login p99':>10} "
+            f"{'feed/s':>7} {'feed p50':>9} {'feed p99':>9}"
+        )
+        saved = hashing.pool
+        try:
+            # the storm is of distinct users from many addresses, not what the login throttles stop
+            with override_settings(THROTTLES={}):
+                for mode in [m for m in options["modes"].split(",") if m]:
+                    if mode not in MODES:
+                        raise CommandError(f"unknown mode {mode!r}")
+                    workers = options["workers"] if mode == "pooled" else 0
+                    hashing.pool = hashing.HashingPool(workers, options["max_queue"])
+                    self.report(mode, self.run(options))
+        finally:
+            hashing.pool = saved
+
+    def run(self, options):
+        deadline = time.perf_counter() + options["seconds"]
+        results = {"login": [], "busy": 0, "feed": []}
+        results_lock = threading.Lock()
+
+        def login(i):
+            client = Client(HTTP_HOST="localhost")
+            _, username = self.users[i]
+            latencies, busy = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = client.post(
+                    "/api/auth/login/",
+                    {"username": username, "password": SEED_PASSWORD},
+                    content_type="application/json",
+                )
+                if response.status_code == 429:
+                    busy += 1
+                    # what a client honouring Retry-After would do, shortened to keep the storm going
+                    time.sleep(0.25)
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+            connections.close_all()
+            with results_lock:
+                results["login"] += latencies
+                results["busy"] += busy
+
+        def read(i):
+            client = Client(HTTP_HOST="localhost")
+            user_id, _ = self.users[-1 - i]
+            auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(User(id=user_id))}"}
+            latencies = []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                client.get("/api/posts/feed/", {"limit": 20}, **auth)
+                latencies.append((time.perf_counter() - started) * 1000)
+            connections.close_all()
+            with results_lock:
+                results["feed"] += latencies
+
+        threads = [threading.Thread(target=login, args=(i,)) for i in range(options["logins"])]
+        threads += [threading.Thread(target=read, args=(i,)) for i in range(options["readers"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results["seconds"] = time.perf_counter() - started
+        return results
+
+    def report(self, mode, r):
+        logins, feed = sorted(r["login"]) or [0.0], sorted(r["feed"]) or [0.0]
+        self.stdout.write(
+            f"{mode:<7} {len(r['login']) / r['seconds']:>9.1f} {r['busy']:>6} {percentile(logins, 50):>10.0f} "
+            f"{percentile(logins, 99):>10.0f} {len(r['feed']) / r['seconds']:>7.1f} {percentile(feed, 50):>9.1f} "
+            f"{percentile(feed, 99):>9.1f}"
+        )
@@ -0,0 +1,102 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ...feed.ranking import load_candidates, rank, score, top_k
+from ...feed.scoring import FeedSources, annotate_scores, get_weights
+from ...models import Community, Page, Post
+
+
+class Rollback(Exception):
+    pass
+
+
+def _best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the NumPy feed ranking with the ORM annotation path on synthetic candidate sets. "
+        "Everything is written inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated candidate counts")
+        parser.add_argument("--k", type=int, default=500, help="how many posts to keep")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s]
+        self.stdout.write(
+            f"{'candidates':>12} {'orm ms':>10} {'numpy ms':>10} {'(load ms)':>10} {'(rank ms)':>10} {'same':>6}"
+        )
+        for n in sizes:
+            try:
+                with transaction.atomic():
+                    self._run(n, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _run(self, n, options):
+        rnd = random.Random(options["seed"])
+        now = timezone.now()
+        k, repeat = options["k"], options["repeat"]
+
+        pages = Page.objects.bulk_create([Page(page_name=f"bench page {i}") for i in range(50)])
+        communities = Community.objects.bulk_create([Community(name=f"bench community {i}") for i in range(30)])
+        sources = FeedSources(
+            uni_page_id=pages[0].page_id,
+            community_ids=[c.community_id for c in communities[:5]],
+            followed_page_ids=[p.page_id for p in pages[1:8]],
+            user_id=None,
+        )
+
+        start = Post.objects.aggregate(m=Max("post_id"))["m"] or 0
+        posts = []
+        for _ in range(n):
+            # skewed engagement: most posts get nothing, a few get a lot
+            posts.append(
+                Post(
+                    author_page=rnd.choice(pages),
+                    community=rnd.choice(communities) if rnd.random() < 0.3 else None,
+                    reactions_count=int(rnd.paretovariate(1.5)) - 1,
+                    comments_count=int(rnd.paretovariate(2.0)) - 1,
+                )
+            )
+        Post.objects.bulk_create(posts, batch_size=5000)
+        # created_at is auto_now_add, so spread it over a week afterwards
+        for p in posts:
+            p.created_at = now - timedelta(seconds=rnd.randint(0, 7 * 86400))
+        Post.objects.bulk_update(posts, ["created_at"], batch_size=2000)
+
+        qs = Post.objects.filter(post_id__gt=start)
+        weights = get_weights()
+
+        def orm():
+            ranked = annotate_scores(qs, sources, weights, now).order_by("-score", "-created_at", "-post_id")
+            return list(ranked.values_list("post_id", flat=True)[:k])
+
+        def numpy():
+            return [r.post_id for r in rank(qs, sources, weights, k, now)]
+
+        orm_ms, orm_ids = _best_of(repeat, orm)
+        numpy_ms, numpy_ids = _best_of(repeat, numpy)
+        load_ms, candidates = _best_of(repeat, lambda: load_candidates(qs))
+        rank_ms, _ = _best_of(repeat, lambda: top_k(candidates, score(candidates, sources, weights, now), k))
+
+        same = "yes" if orm_ids == numpy_ids else "no"
+        self.stdout.write(f"{n:>12} {orm_ms:>10.1f} {numpy_ms:>10.1f} {load_ms:>10.1f} {rank_ms:>10.1f} {same:>6}")
@@ -0,0 +1,107 @@
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from ... import reactions
+from ...models import Post, PostReaction
+from ...reaction_buffer import ReactionBuffer
+from .bench_api import percentile
+
+User = get_user_model()
+
+MODES = ["direct", "buffered"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test for a live announcement: --threads clients tap react/unreact on one new post as fast as "
+        "they can, once writing every reaction in its own transaction (direct) and once through a "
+        "ReactionBuffer (buffered). Reports reactions/s, latency of a tap and the rows finally written. "
+        "Uses seeded users; the post and its reactions are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=5.0, help="duration of each mode's run")
+        parser.add_argument("--flush-ms", type=int, default=100, help="buffered mode's flush interval")
+        parser.add_argument("--modes", default=",".join(MODES), help=f"any of {','.join(MODES)}")
+        parser.add_argument("--prefix", default="seed", help="username prefix used by seed_campus")
+
+    def handle(self, *args, **options):
+        user_ids = list(
+            User.objects.filter(username__startswith=options["prefix"]).order_by("id").values_list("id", flat=True)
+        )
+        if len(user_ids) < options["threads"]:
+            raise CommandError("not enough seeded users, run seed_campus first")
+
+        self.stdout.write(
+            f"{'mode':<9} {'taps/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'locked':>7} {'rows':>7} {'count ok':>9}"
+        )
+        for mode in [m for m in options["modes"].split(",") if m]:
+            if mode not in MODES:
+                raise CommandError(f"unknown mode {mode!r}")
+            post = Post.objects.create(author_user_id=user_ids[0], content_text="bench announcement")
+            try:
+                result = self.run(mode, post.post_id, user_ids, options)
+                post.refresh_from_db()
+                rows = PostReaction.objects.filter(post=post).count()
+                self.report(mode, result, rows, post.reactions_count == rows)
+            finally:
+                post.delete()
+
+    def run(self, mode, post_id, user_ids, options):
+        threads = options["threads"]
+        deadline = time.perf_counter() + options["seconds"]
+        results = {"taps": 0, "locked": 0, "latencies": []}
+        results_lock = threading.Lock()
+        journal = tempfile.TemporaryDirectory()
+        buffer = ReactionBuffer(options["flush_ms"], journal_dir=journal.name) if mode == "buffered" else None
+
+        def client(i):
+            # each client owns every threads-th user and keeps flipping their reactions
+            mine = user_ids[i::threads]
+            latencies, locked, n = [], 0, 0
+            while time.perf_counter() < deadline:
+                user_id = mine[n % len(mine)]
+                reacted = (n // len(mine)) % 2 == 0
+                started = time.perf_counter()
+                try:
+                    if buffer is not None:
+                        buffer.add(reactions.POST, post_id, user_id, reacted=reacted)
+                    elif reacted:
+                        reactions.react(reactions.POST, post_id, user_id)
+                    else:
+                        reactions.unreact(reactions.POST, post_id, user_id)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except OperationalError:
+                    locked += 1
+                n += 1
+            connections.close_all()
+            with results_lock:
+                results["taps"] += len(latencies)
+                results["locked"] += locked
+                results["latencies"] += latencies
+
+        workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        if buffer is not None:
+            # a reaction only counts once it is in the database
+            buffer.flush()
+        results["seconds"] = time.perf_counter() - started
+        journal.cleanup()
+        return results
+
+    def report(self, mode, r, rows, count_ok):
+        latencies = sorted(r["latencies"]) or [0.0]
+        self.stdout.write(
+            f"{mode:<9} {r['taps'] / r['seconds']:>8.0f} {percentile(latencies, 50):>8.2f} "
+            f"{percentile(latencies, 99):>8.2f} {r['locked']:>7} {rows:>7} {str(count_ok):>9}"
+        )
@@ -0,0 +1,158 @@
+import asyncio
+import importlib.util
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .bench_api import percentile
+
+User = get_user_model()
+
+PATHS = {"feed": "/api/posts/feed/?limit=20", "me": "/api/auth/me/"}
+
+
+def server_command(name, port, options):
+    if name == "asgi":
+        return [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.asgi:application",
+            "--host=127.0.0.1",
+            f"--port={port}",
+            f"--workers={options['workers']}",
+            "--log-level=warning",
+            "--no-access-log",
+        ]
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "backend.wsgi:application",
+        f"--bind=127.0.0.1:{port}",
+        f"--workers={options['workers']}",
+        # gthread: the usual way to give a WSGI worker concurrency
+        f"--threads={options['threads']}",
+        "--log-level=warning",
+    ]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise CommandError(f"server did not start listening on {port}")
+
+
+async def fetch(reader, writer, path, token):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def load(port, path, tokens, concurrency, seconds):
+    """`concurrency` keep-alive connections sending requests back to back for `seconds`."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(i):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        n = i
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = await fetch(reader, writer, path, tokens[n % len(tokens)])
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status >= 400
+                n += concurrency
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts the project under uvicorn (ASGI, async views) and gunicorn (WSGI, gthread workers) in turn and "
+        "hammers the feed and me endpoints with N concurrent keep-alive connections, reporting throughput and "
+        "latency. Needs uvicorn and gunicorn installed and seeded users (seed_campus, rebuild_feed --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", default="asgi,wsgi")
+        parser.add_argument("--endpoints", default="feed,me", help=f"any of {','.join(PATHS)}")
+        parser.add_argument("--concurrency", default="16,64,256", help="comma separated connection counts")
+        parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+        parser.add_argument("--workers", type=int, default=1, help="server processes")
+        parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+        parser.add_argument("--prefix", default="seed", help="username prefix used by seed_campus")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        servers = [s for s in options["servers"].split(",") if s]
+        for name, module in (("asgi", "uvicorn"), ("wsgi", "gunicorn")):
+            if name in servers and importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed (pip install {module})")
+
+        user_ids = list(
+            User.objects.filter(username__startswith=options["prefix"], is_active=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:500]
+        )
+        if not user_ids:
+            raise CommandError("no seeded users found, run seed_campus first")
+        tokens = [str(AccessToken.for_user(User(id=user_id))) for user_id in user_ids]
+
+        self.stdout.write(
+            f"{'server':<6} {'endpoint':<8} {'conns':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for server in servers:
+            process = subprocess.Popen(server_command(server, options["port"], options), cwd=settings.BASE_DIR)
+            try:
+                wait_for_port(options["port"])
+                for endpoint in [e for e in options["endpoints"].split(",") if e]:
+                    path = PATHS[endpoint]
+                    # warm up: one request per user loads (and caches) every feed
+                    asyncio.run(self.warm_up(options["port"], path, tokens))
+                    for concurrency in [int(c) for c in options["concurrency"].split(",") if c]:
+                        latencies, errors = asyncio.run(
+                            load(options["port"], path, tokens, concurrency, options["seconds"])
+                        )
+                        self.report(server, endpoint, concurrency, latencies, errors, options["seconds"])
+            finally:
+                process.terminate()
+                process.wait()
+
+    async def warm_up(self, port, path, tokens):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for token in tokens:
+                await fetch(reader, writer, path, token)
+        finally:
+            writer.close()
+
+    def report(self, server, endpoint, concurrency, latencies, errors, seconds):
+        latencies = sorted(latencies) or [0.0]
+        self.stdout.write(
+            f"{server:<6} {endpoint:<8} {concurrency:>6} {len(latencies) / seconds:>8.0f} "
+            f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 99):>8.1f} {errors:>7}"
+        )
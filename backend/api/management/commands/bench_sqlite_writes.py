@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from ...models import Comment, Post
+from .bench_api import percentile
+
+User = get_user_model()
+
+PROFILES = ["stock", "tuned", "queued"]
+
+
+def profile_settings(name, path):
+    """DATABASES entry for one profile, on a scratch file. "queued" is what settings.py ships."""
+    base = dict(connections.settings["default"], NAME=path, TEST={})
+    if name == "stock":
+        # what the project had before: default backend and options, one connection per request
+        return dict(base, ENGINE="django.db.backends.sqlite3", OPTIONS={}, CONN_MAX_AGE=0, SERIALIZE_WRITES=False)
+    options = dict(settings.DATABASES["default"].get("OPTIONS", {}))
+    tuned = dict(base, ENGINE="api.sqlite", OPTIONS=options, CONN_MAX_AGE=600)
+    return dict(tuned, SERIALIZE_WRITES=name == "queued")
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs concurrent comment writers (read post, insert comment, bump counter) and feed-like readers "
+        "against scratch SQLite files, once per engine profile, and reports throughput, latency and "
+        "'database is locked' errors. The project database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0, help="duration of each profile's run")
+        parser.add_argument("--profiles", default=",".join(PROFILES), help=f"any of {','.join(PROFILES)}")
+
+    def handle(self, *args, **options):
+        profiles = [p for p in options["profiles"].split(",") if p]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"unknown profiles: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(
+            f"{'profile':<8} {'writes/s':>9} {'reads/s':>9} {'locked':>7} {'write p50':>10} {'write p99':>10}"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in profiles:
+                alias = f"bench_{name}"
+                connections.settings[alias] = profile_settings(name, os.path.join(tmp, f"{name}.sqlite3"))
+                try:
+                    self.report(name, self.run(alias, options))
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+    def run(self, alias, options):
+        call_command("migrate", database=alias, verbosity=0)
+        user = User.objects.db_manager(alias).create_user(username="bench", password=None)
+        post_ids = [
+            p.post_id for p in Post.objects.using(alias).bulk_create(Post(author_user=user) for _ in range(100))
+        ]
+        connections[alias].close()
+
+        deadline = time.perf_counter() + options["seconds"]
+        results = {"writes": 0, "reads": 0, "locked": 0, "latencies": []}
+        results_lock = threading.Lock()
+
+        def writer(i):
+            latencies, locked, n = [], 0, 0
+            while time.perf_counter() < deadline:
+                post_id = post_ids[(i * 7 + n) % len(post_ids)]
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic(using=alias):
+                        # a read before the write, like the real comment/reaction views
+                        Post.objects.using(alias).filter(pk=post_id).values_list("comments_count").get()
+                        Comment.objects.using(alias).bulk_create(
+                            [Comment(post_id=post_id, author_user_id=user.id, content="bench")]
+                        )
+                        Post.objects.using(alias).filter(pk=post_id).update(comments_count=F("comments_count") + 1)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except OperationalError:
+                    locked += 1
+                n += 1
+                # end of "request": with CONN_MAX_AGE=0 this closes the connection
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+            with results_lock:
+                results["writes"] += len(latencies)
+                results["locked"] += locked
+                results["latencies"] += latencies
+
+        def reader():
+            n = 0
+            while time.perf_counter() < deadline:
+                try:
+                    list(
+                        Post.objects.using(alias).order_by("-created_at").values_list("post_id", "comments_count")[:20]
+                    )
+                    n += 1
+                except OperationalError:
+                    pass
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+            with results_lock:
+                results["reads"] += n
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options["writers"])]
+        threads += [threading.Thread(target=reader) for _ in range(options["readers"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        results["seconds"] = options["seconds"]
+        return results
+
+    def report(self, name, r):
+        latencies = sorted(r["latencies"]) or [0.0]
+        self.stdout.write(
+            f"{name:<8} {r['writes'] / r['seconds']:>9.0f} {r['reads'] / r['seconds']:>9.0f} {r['locked']:>7} "
+            f"{percentile(latencies, 50):>7.2f} ms {percentile(latencies, 99):>7.2f} ms"
+        )
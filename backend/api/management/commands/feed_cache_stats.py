@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...feed import cache as feed_cache
+
+
+class Command(BaseCommand):
+    help = "Prints the feed cache hit/miss counters (needs a cache backend shared with the server, e.g. file or db)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        s = feed_cache.stats(reset=options["reset"])
+        self.stdout.write(f"hits: {s['hits']}  misses: {s['misses']}  hit rate: {s['hit_rate']:.1%}")
@@ -0,0 +1,284 @@
+import csv
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Instructor, Page, Student, UniversityDomain, UserProfile
+from ...views.auth.signup.signup import get_email_domain, resolve_role_from_domain
+
+User = get_user_model()
+
+KINDS = ["pages", "domains", "users"]
+
+
+class SkipRow(Exception):
+    pass
+
+
+def read_rows(path, fmt):
+    """Yields one dict per row without loading the whole file: CSV with a header row, or one JSON object per line."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def init_hasher():
+    # spawned workers need the project settings for PASSWORD_HASHERS
+    django.setup()
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def field(row, name, default=""):
+    return str(row.get(name) or default).strip()
+
+
+def flag(row, name):
+    value = row.get(name)
+    if isinstance(value, bool):
+        return value
+    return (value or "").strip().lower() in ("1", "true", "yes")
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-imports pages, university domains or users (with profile and student/instructor row) from a CSV or "
+        "JSONL file. Rows are streamed in batches, each batch is one transaction of bulk_creates; passwords are "
+        "hashed in a process pool. Progress is checkpointed, so an interrupted import picks up where it stopped. "
+        "Import pages, then domains, then users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=KINDS)
+        parser.add_argument("path", help=".csv or .jsonl")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000, help="rows per transaction")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="password hashing processes")
+        parser.add_argument("--checkpoint", help="default: PATH.progress")
+        parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from row 0")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        checkpoint = options["checkpoint"] or f"{path}.progress"
+        done = 0 if options["restart"] else self.load_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f"resuming after row {done}")
+
+        importer = getattr(self, f"import_{options['kind']}")
+        self.prepare(options)
+        rows = itertools.islice(read_rows(path, fmt), done, None)
+        totals = {"rows": 0, "created": 0, "skipped": 0}
+        started = time.perf_counter()
+        try:
+            while batch := list(itertools.islice(rows, options["batch_size"])):
+                # parsing and password hashing happen before the transaction: with IMMEDIATE
+                # transactions it holds SQLite's write lock, which only the inserts need
+                write = importer(batch, first=done + 1)
+                with transaction.atomic():
+                    created, skipped = write()
+                done += len(batch)
+                # only after the commit: a crash before this line redoes the batch, and the
+                # existing-key checks below make that a no-op
+                self.save_checkpoint(checkpoint, done)
+
+                totals["rows"] += len(batch)
+                totals["created"] += created
+                totals["skipped"] += skipped
+                self.stdout.write(
+                    f"  {done} rows, {totals['created']} created, {totals['skipped']} skipped, "
+                    f"{totals['rows'] / (time.perf_counter() - started):.0f} rows/s"
+                )
+        finally:
+            if self.pool:
+                self.pool.shutdown()
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"imported {totals['created']} {options['kind']} from {totals['rows']} rows in {elapsed:.1f}s "
+                f"({totals['rows'] / elapsed if elapsed else 0:.0f} rows/s), {totals['skipped']} skipped"
+            )
+        )
+
+    @staticmethod
+    def load_checkpoint(checkpoint):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return json.load(f)["rows"]
+
+    @staticmethod
+    def save_checkpoint(checkpoint, rows):
+        with open(f"{checkpoint}.tmp", "w") as f:
+            json.dump({"rows": rows}, f)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    def prepare(self, options):
+        self.pool = None
+        self.workers = max(options["workers"], 1)
+        if options["kind"] == "domains":
+            self.pages_by_name = dict(Page.objects.values_list("page_name", "page_id"))
+        if options["kind"] == "users":
+            # every active domain fits in memory, signup's per-user lookup does not scale
+            self.universities = dict(UniversityDomain.objects.filter(is_active=True).values_list("domain", "page_id"))
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_hasher)
+
+    def skip(self, line, reason):
+        self.stderr.write(f"  row {line}: {reason}")
+
+    def valid_rows(self, batch, first, parse):
+        """Parses every row of the batch, reporting (and dropping) the invalid ones."""
+        parsed = []
+        for line, row in enumerate(batch, start=first):
+            try:
+                parsed.append(parse(row))
+            except SkipRow as e:
+                self.skip(line, e)
+        return parsed
+
+    def import_pages(self, batch, first):
+        def parse(row):
+            name = field(row, "page_name")
+            page_type = field(row, "page_type", Page.PageType.OTHER)
+            if not name:
+                raise SkipRow("page_name is required")
+            if page_type not in Page.PageType.values:
+                raise SkipRow(f"unknown page_type {page_type!r}")
+            return Page(
+                page_name=name,
+                page_type=page_type,
+                description=field(row, "description") or None,
+                verified=flag(row, "verified"),
+            )
+
+        pages = self.valid_rows(batch, first, parse)
+
+        def write():
+            # page names are how domains refer to pages, so they are the import key
+            existing = set(
+                Page.objects.filter(page_name__in=[p.page_name for p in pages]).values_list("page_name", flat=True)
+            )
+            new = {p.page_name: p for p in pages if p.page_name not in existing}
+            Page.objects.bulk_create(new.values())
+            return len(new), len(batch) - len(new)
+
+        return write
+
+    def import_domains(self, batch, first):
+        def parse(row):
+            domain = field(row, "domain").lower()
+            page_id = self.pages_by_name.get(field(row, "page_name"))
+            if not domain:
+                raise SkipRow("domain is required")
+            if page_id is None:
+                raise SkipRow(f"no page named {field(row, 'page_name')!r}")
+            return UniversityDomain(page_id=page_id, domain=domain, is_active=not flag(row, "inactive"))
+
+        domains = self.valid_rows(batch, first, parse)
+
+        def write():
+            existing = set(
+                UniversityDomain.objects.filter(domain__in=[d.domain for d in domains]).values_list("domain", flat=True)
+            )
+            new = {d.domain: d for d in domains if d.domain not in existing}
+            UniversityDomain.objects.bulk_create(new.values())
+            return len(new), len(batch) - len(new)
+
+        return write
+
+    def import_users(self, batch, first):
+        def parse(row):
+            username = field(row, "username").lower()
+            academic_email = field(row, "academic_email").lower()
+            domain = get_email_domain(academic_email)
+            # the same rules as send_code and signup
+            if not re.fullmatch(r"[a-z]+", username):
+                raise SkipRow(f"invalid username {username!r}")
+            if domain not in self.universities:
+                raise SkipRow(f"unsupported academic email domain {domain!r}")
+            role = field(row, "role") or resolve_role_from_domain(domain)
+            if role not in ("student", "instructor"):
+                raise SkipRow(f"unknown role {role!r}")
+            return {
+                "row": row,
+                "username": username,
+                "academic_email": academic_email,
+                "university_page_id": self.universities[domain],
+                "role": role,
+            }
+
+        users = self.valid_rows(batch, first, parse)
+        # no hashing for users a previous run (or an earlier row) already created
+        known = self.existing_usernames(users)
+        users = list({u["username"]: u for u in users if u["username"] not in known}.values())
+
+        passwords = [u["row"].get("password") or None for u in users]
+        hashes = self.pool.map(hash_password, passwords, chunksize=max(len(passwords) // (4 * self.workers), 1))
+        for u, password in zip(users, hashes):
+            u["password"] = password
+
+        return lambda: self.write_users(users, len(batch))
+
+    @staticmethod
+    def existing_usernames(users):
+        names = [u["username"] for u in users]
+        return set(User.objects.filter(username__in=names).values_list("username", flat=True))
+
+    def write_users(self, users, batch_size):
+        # checked again under the lock, someone may have signed up while the batch was hashed
+        known = self.existing_usernames(users)
+        users = [u for u in users if u["username"] not in known]
+        created = User.objects.bulk_create(
+            User(username=u["username"], email=field(u["row"], "email").lower(), password=u["password"]) for u in users
+        )
+
+        profiles, students, instructors = [], [], []
+        for user, u in zip(created, users):
+            row = u["row"]
+            profiles.append(
+                UserProfile(user=user, academic_email=u["academic_email"], full_name=field(row, "full_name"))
+            )
+            if u["role"] == "student":
+                students.append(
+                    Student(
+                        user=user,
+                        university_page_id=u["university_page_id"],
+                        major=field(row, "major"),
+                        academic_level=field(row, "academic_level"),
+                    )
+                )
+            else:
+                instructors.append(
+                    Instructor(
+                        user=user,
+                        university_page_id=u["university_page_id"],
+                        academic_title=field(row, "academic_title"),
+                        department=field(row, "department"),
+                        instructor_type=field(row, "instructor_type"),
+                    )
+                )
+        UserProfile.objects.bulk_create(profiles)
+        Student.objects.bulk_create(students)
+        Instructor.objects.bulk_create(instructors)
+        return len(created), batch_size - len(created)
@@ -0,0 +1,157 @@
+import contextlib
+import io
+import re
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ...feed.fanout import rebuild_user_feed
+from ...models import Message, Notification
+from .bench_api import Command as BenchApiCommand
+from .bench_api import Rollback, User
+
+# what is worth an index: a table read from start to end, or rows sorted in a temp b-tree
+SQLITE_PROBLEMS = [
+    # also "SCAN t USING COVERING INDEX i": the whole index is read
+    (re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)"), "full scan"),
+    (re.compile(r"USE TEMP B-TREE"), "temp b-tree"),
+]
+OTHER_PROBLEMS = [
+    (re.compile(r"Seq Scan on (\w+)"), "full scan"),
+    (re.compile(r"\bSort\b"), "sort"),
+]
+
+ENDPOINTS = ["feed", "me", "login", "signup", "send_code", "verify_code"]
+# hot paths without an endpoint yet, run straight through the ORM
+WORKLOADS = ["rebuild_feed", "notifications_unread", "conversation_messages"]
+
+
+class Command(BenchApiCommand):
+    help = (
+        "Runs every API endpoint and the other hot ORM paths once against the current (seeded) database, "
+        "EXPLAINs each query they issue and reports full table scans and temp b-tree sorts, with the best "
+        "of --repeat timings. Writes are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="seed", help="username prefix used by seed_campus")
+        parser.add_argument("--repeat", type=int, default=5, help="timing runs per query")
+        parser.add_argument("--plans", action="store_true", help="print the plan of every query, not only problems")
+
+    def handle(self, *args, **options):
+        self.users = list(
+            User.objects.filter(username__startswith=options["prefix"], is_active=True)
+            .order_by("id")
+            .values_list("id", "username")[:10]
+        )
+        if not self.users:
+            raise CommandError("no seeded users found, run seed_campus first")
+        self.prefix = options["prefix"]
+        self.client = Client(HTTP_HOST="localhost")
+        self.tokens = {user_id: str(AccessToken.for_user(User(id=user_id))) for user_id, _ in self.users}
+        # the busiest inbox and conversation, where a missing index hurts most
+        self.notified_user_id = self.busiest(Notification, "user_id") or self.users[0][0]
+        self.conversation_id = self.busiest(Message, "conversation_id")
+
+        totals = {"queries": 0, "problems": 0, "ms": 0.0}
+        try:
+            with transaction.atomic():
+                for name in ENDPOINTS + WORKLOADS:
+                    self.advise(name, self.capture(name), options, totals)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            f"\n{totals['queries']} queries, {totals['problems']} with problems, "
+            f"{totals['ms']:.2f} ms in total (best of {options['repeat']})"
+        )
+
+    def capture(self, name):
+        if name in ENDPOINTS:
+            send, path, kwargs = getattr(self, f"prepare_{name}")(1)
+            run = lambda: send(path, **kwargs)  # noqa: E731
+        else:
+            run = getattr(self, f"run_{name}")
+        with CaptureQueriesContext(connection) as ctx, contextlib.redirect_stdout(io.StringIO()):
+            run()
+        return [q["sql"] for q in ctx.captured_queries]
+
+    @staticmethod
+    def busiest(model, field):
+        row = model.objects.values(field).annotate(n=Count("pk")).order_by("-n").first()
+        return row[field] if row else None
+
+    def advise(self, name, queries, options, totals):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        seen = set()
+        for sql in queries:
+            if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")) or sql in seen:
+                continue
+            seen.add(sql)
+            plan = self.explain(sql)
+            problems = self.problems(plan)
+            ms = self.time(sql, options["repeat"])
+
+            totals["queries"] += 1
+            totals["problems"] += bool(problems)
+            totals["ms"] += ms
+            if not problems and not options["plans"]:
+                continue
+            flagged = self.style.WARNING(", ".join(problems)) if problems else "ok"
+            self.stdout.write(f"  {ms:8.2f} ms  {flagged}  {sql[:110]}")
+            for line in plan:
+                self.stdout.write(f"               {line}")
+
+    def explain(self, sql):
+        prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            # sqlite: (id, parent, notused, detail), others: one text column
+            return [row[-1] for row in cursor.fetchall()]
+
+    def problems(self, plan):
+        patterns = SQLITE_PROBLEMS if connection.vendor == "sqlite" else OTHER_PROBLEMS
+        found = []
+        for line in plan:
+            for pattern, label in patterns:
+                match = pattern.search(line)
+                if match:
+                    found.append(f"{label} {match.group(1)}" if match.groups() else label)
+        return found
+
+    def time(self, sql, repeat):
+        best = None
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                # writes are undone after every run so each one does the same work
+                savepoint = transaction.savepoint()
+                started = time.perf_counter()
+                cursor.execute(sql)
+                cursor.fetchall()
+                elapsed = (time.perf_counter() - started) * 1000
+                transaction.savepoint_rollback(savepoint)
+                best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def prepare_send_code(self, i):
+        body = {"username": f"{self.prefix}advisor", "academicEmail": "advisor@students.ptuk.edu.ps"}
+        return self.client.post, "/api/auth/send_code/", {"data": body, "content_type": "application/json"}
+
+    def prepare_verify_code(self, i):
+        body = {"academicEmail": "advisor@students.ptuk.edu.ps", "code": "000000"}
+        return self.client.post, "/api/auth/verify_code/", {"data": body, "content_type": "application/json"}
+
+    def run_rebuild_feed(self):
+        rebuild_user_feed(User.objects.get(pk=self.users[0][0]))
+
+    def run_notifications_unread(self):
+        list(Notification.objects.filter(user_id=self.notified_user_id, is_read=False).order_by("-created_at")[:20])
+
+    def run_conversation_messages(self):
+        list(Message.objects.filter(conversation_id=self.conversation_id).order_by("-sent_at")[:50])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...purge import purge_expired_verifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired email verification codes, --batch-size rows per transaction. Meant for cron; "
+        "VERIFICATION_PURGE can run the same purge inside the web processes instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_verifications(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"deleted {deleted} expired verification codes"))
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from ...feed import cache as feed_cache
+from ...feed.fanout import rebuild_user_feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Regenerates the materialized home feed (feed_entry) of one, some or all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="username or id, can be repeated")
+        parser.add_argument("--all", action="store_true", help="rebuild every active user")
+        parser.add_argument(
+            "--changed-since",
+            type=int,
+            metavar="MINUTES",
+            help="rebuild users who joined or left a community or (un)followed a page in the last MINUTES minutes",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+
+        if options["all"]:
+            pass
+        elif options["user"]:
+            ids = [u for u in options["user"] if u.isdigit()]
+            names = [u.lower() for u in options["user"] if not u.isdigit()]
+            users = users.filter(Q(id__in=ids) | Q(username__in=names))
+        elif options["changed_since"] is not None:
+            since = timezone.now() - timedelta(minutes=options["changed_since"])
+            users = users.filter(profile__feed_sources_changed_at__gte=since)
+        else:
+            raise CommandError("pass --user, --all or --changed-since")
+
+        created = updated = deleted = count = 0
+        for user in users.select_related("student_profile", "instructor_profile").iterator():
+            c, u, d = rebuild_user_feed(user)
+            if c or u or d:
+                feed_cache.invalidate_users([user.id])
+            created, updated, deleted = created + c, updated + u, deleted + d
+            count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"rebuilt {count} feeds: {created} added, {updated} rescored, {deleted} removed")
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recounts the denormalized reaction/comment/reply counters on posts and comments and fixes any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only report drifted rows")
+
+    def handle(self, *args, **options):
+        drift = reconcile(dry_run=options["dry_run"])
+        for counter, rows in drift.items():
+            self.stdout.write(f"{counter}: {rows} drifted rows")
+
+        verb = "found" if options["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(drift.values())} drifted counters"))
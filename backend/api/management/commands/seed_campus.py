@@ -0,0 +1,338 @@
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ...counters import reconcile
+from ...models import (
+    Comment,
+    Community,
+    CommunityMember,
+    Conversation,
+    ConversationMember,
+    EmailVerification,
+    FollowPage,
+    Instructor,
+    Message,
+    Notification,
+    Page,
+    Post,
+    PostMedia,
+    PostReaction,
+    Student,
+    UniversityDomain,
+    UserProfile,
+)
+
+User = get_user_model()
+
+SEED_PASSWORD = "campus-seed"
+
+
+def letters(i):
+    """0 -> 'a', 25 -> 'z', 26 -> 'ba' ... usernames may only contain lowercase letters."""
+    out = ""
+    while True:
+        out = chr(ord("a") + i % 26) + out
+        i //= 26
+        if not i:
+            return out
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Lets bulk_create keep the created_at/sent_at we generate instead of auto_now_add's now()."""
+    saved = [(f, f.auto_now_add) for f in fields]
+    for f, _ in saved:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, value in saved:
+            f.auto_now_add = value
+
+
+class Skewed:
+    """Zipf-like picker: the item at rank r is chosen with weight 1 / r**s."""
+
+    def __init__(self, rnd, items, s=1.1):
+        self.rnd = rnd
+        self.items = list(items)
+        self.cum = list(itertools.accumulate(1 / (r**s) for r in range(1, len(self.items) + 1)))
+
+    def one(self):
+        return self.rnd.choices(self.items, cum_weights=self.cum)[0]
+
+    def some(self, k):
+        # distinct items, popular ones first in line
+        k = min(k, len(self.items))
+        picked = set()
+        while len(picked) < k:
+            picked.update(self.rnd.choices(self.items, cum_weights=self.cum, k=k - len(picked)))
+        return picked
+
+
+def heavy_tail(rnd, alpha, cap):
+    """0 most of the time, occasionally a lot (pareto), never more than cap."""
+    return min(int(rnd.paretovariate(alpha)) - 1, cap)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generates a synthetic campus (users, profiles, pages, communities, follows, posts, media, reactions, "
+        "comments, messages, notifications, email verifications) with skewed distributions. "
+        f"Every seeded user's password is {SEED_PASSWORD!r}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=10000, help="10k to 1M")
+        parser.add_argument("--users", type=int, help="default: posts / 10 (at least 100)")
+        parser.add_argument("--universities", type=int, default=3)
+        parser.add_argument("--prefix", default="seed", help="lowercase letters prepended to every username")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not options["prefix"].isalpha() or not options["prefix"].islower():
+            raise CommandError("--prefix must be lowercase letters")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(f"users starting with {options['prefix']!r} already exist, pick another --prefix")
+
+        self.rnd = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.batch = options["batch_size"]
+        self.prefix = options["prefix"]
+        n_posts = options["posts"]
+        n_users = options["users"] or max(n_posts // 10, 100)
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.step("pages", lambda: self.seed_pages(options["universities"], max(n_users // 200, 10)))
+            self.step("users", lambda: self.seed_users(n_users))
+            self.step("communities", lambda: self.seed_communities(max(n_users // 50, 5)))
+            self.step("follows", self.seed_follows)
+            self.step("posts", lambda: self.seed_posts(n_posts))
+            self.step("messages", lambda: self.seed_messages(max(n_users // 5, 10)))
+            self.step("notifications", self.seed_notifications)
+            self.step("verifications", self.seed_verifications)
+            self.step("counters", lambda: sum(reconcile().values()))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"seeded {n_users} users and {n_posts} posts in {time.perf_counter() - started:.1f}s, "
+                "run `rebuild_feed --all` to materialize their feeds"
+            )
+        )
+
+    def step(self, name, fn):
+        started = time.perf_counter()
+        count = fn()
+        self.stdout.write(f"  {name}: {count} rows in {time.perf_counter() - started:.1f}s")
+
+    def past(self, days):
+        # squared so recent timestamps are more common than old ones
+        return self.now - timedelta(seconds=int(days * 86400 * self.rnd.random() ** 2))
+
+    def seed_pages(self, universities, others):
+        self.universities = Page.objects.bulk_create(
+            [
+                Page(page_name=f"{self.prefix} university {i}", page_type=Page.PageType.UNIVERSITY, verified=True)
+                for i in range(universities)
+            ]
+        )
+        domains = []
+        for i, uni in enumerate(self.universities):
+            domains.append(UniversityDomain(page=uni, domain=f"students.{self.prefix}{letters(i)}.edu"))
+            domains.append(UniversityDomain(page=uni, domain=f"{self.prefix}{letters(i)}.edu"))
+        UniversityDomain.objects.bulk_create(domains)
+
+        types = [t for t in Page.PageType.values if t != Page.PageType.UNIVERSITY]
+        other = Page.objects.bulk_create(
+            [Page(page_name=f"{self.prefix} page {i}", page_type=self.rnd.choice(types)) for i in range(others)]
+        )
+        self.pages = Skewed(self.rnd, self.universities + other)
+        return len(self.universities) + len(other) + len(domains)
+
+    def seed_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        users = User.objects.bulk_create(
+            [User(username=f"{self.prefix}{letters(i)}", password=password) for i in range(count)],
+            batch_size=self.batch,
+        )
+        self.user_ids = [u.id for u in users]
+        self.users = Skewed(self.rnd, self.user_ids)
+
+        profiles, students, instructors = [], [], []
+        for i, user_id in enumerate(self.user_ids):
+            u = self.rnd.randrange(len(self.universities))
+            uni = self.universities[u]
+            email = f"{self.prefix}{letters(i)}@students.{self.prefix}{letters(u)}.edu"
+            profiles.append(UserProfile(user_id=user_id, academic_email=email))
+            if self.rnd.random() < 0.9:
+                students.append(Student(user_id=user_id, university_page=uni))
+            else:
+                instructors.append(Instructor(user_id=user_id, university_page=uni))
+        UserProfile.objects.bulk_create(profiles, batch_size=self.batch)
+        Student.objects.bulk_create(students, batch_size=self.batch)
+        Instructor.objects.bulk_create(instructors, batch_size=self.batch)
+        return len(users) * 2
+
+    def seed_communities(self, count):
+        communities = Community.objects.bulk_create(
+            [Community(name=f"{self.prefix} community {i}") for i in range(count)]
+        )
+        self.communities = Skewed(self.rnd, [c.community_id for c in communities])
+
+        members = []
+        for user_id in self.user_ids:
+            joined = heavy_tail(self.rnd, 1.5, 50)
+            for community_id in self.communities.some(joined):
+                members.append(CommunityMember(community_id=community_id, user_id=user_id))
+        CommunityMember.objects.bulk_create(members, batch_size=self.batch)
+        return len(communities) + len(members)
+
+    def seed_follows(self):
+        follows = []
+        for user_id in self.user_ids:
+            for page in self.pages.some(heavy_tail(self.rnd, 1.3, 100)):
+                follows.append(FollowPage(user_id=user_id, page=page))
+        FollowPage.objects.bulk_create(follows, batch_size=self.batch)
+        return len(follows)
+
+    def seed_posts(self, count):
+        rows = 0
+        for start in range(0, count, self.batch):
+            posts = []
+            for _ in range(min(self.batch, count - start)):
+                post = Post(created_at=self.past(30), post_type=Post.PostType.NORMAL)
+                if self.rnd.random() < 0.3:
+                    post.author_page = self.pages.one()
+                    if post.author_page.page_type == Page.PageType.UNIVERSITY:
+                        post.post_type = Post.PostType.ANNOUNCEMENT
+                else:
+                    post.author_user_id = self.users.one()
+                if self.rnd.random() < 0.3:
+                    post.community_id = self.communities.one()
+                post.content_text = f"post {start + len(posts)}"
+                posts.append(post)
+
+            with explicit_timestamps(Post._meta.get_field("created_at")):
+                posts = Post.objects.bulk_create(posts)
+            rows += len(posts) + self.seed_engagement(posts)
+        return rows
+
+    def seed_engagement(self, posts):
+        media, reactions, comments = [], [], []
+        for post in posts:
+            if self.rnd.random() < 0.2:
+                for order in range(self.rnd.randint(1, 4)):
+                    media.append(
+                        PostMedia(
+                            post=post,
+                            media_type=PostMedia.MediaType.URL,
+                            media_url=f"https://picsum.photos/seed/{post.post_id}-{order}/600",
+                            order_index=order,
+                        )
+                    )
+            for user_id in self.users.some(heavy_tail(self.rnd, 1.2, 1000)):
+                reactions.append(PostReaction(post=post, user_id=user_id))
+            for _ in range(heavy_tail(self.rnd, 1.6, 200)):
+                comments.append(
+                    Comment(post=post, author_user_id=self.users.one(), content="nice", created_at=self.past(3))
+                )
+
+        PostMedia.objects.bulk_create(media, batch_size=self.batch)
+        PostReaction.objects.bulk_create(reactions, batch_size=self.batch)
+        with explicit_timestamps(Comment._meta.get_field("created_at")):
+            comments = Comment.objects.bulk_create(comments, batch_size=self.batch)
+            replies = [
+                Comment(
+                    post_id=c.post_id,
+                    parent_comment=c,
+                    author_user_id=self.users.one(),
+                    content="agreed",
+                    created_at=c.created_at,
+                )
+                for c in comments
+                if self.rnd.random() < 0.2
+            ]
+            Comment.objects.bulk_create(replies, batch_size=self.batch)
+        return len(media) + len(reactions) + len(comments) + len(replies)
+
+    def seed_messages(self, count):
+        conversations = Conversation.objects.bulk_create([Conversation() for _ in range(count)])
+        members, messages = [], []
+        for conversation in conversations:
+            pair = list(self.users.some(2))
+            for user_id in pair:
+                members.append(ConversationMember(conversation=conversation, user_id=user_id))
+            for _ in range(1 + heavy_tail(self.rnd, 1.1, 200)):
+                messages.append(
+                    Message(
+                        conversation=conversation,
+                        sender_user_id=self.rnd.choice(pair),
+                        content="hey",
+                        sent_at=self.past(30),
+                    )
+                )
+        ConversationMember.objects.bulk_create(members, batch_size=self.batch)
+        with explicit_timestamps(Message._meta.get_field("sent_at")):
+            Message.objects.bulk_create(messages, batch_size=self.batch)
+        return len(conversations) + len(members) + len(messages)
+
+    def seed_notifications(self):
+        notifications = []
+        for user_id in self.user_ids:
+            for _ in range(heavy_tail(self.rnd, 1.2, 500)):
+                created_at = self.past(30)
+                notifications.append(
+                    Notification(
+                        user_id=user_id,
+                        type=self.rnd.choice(Notification.Type.values),
+                        content="something happened",
+                        # older ones have mostly been read
+                        is_read=self.now - created_at > timedelta(days=2) and self.rnd.random() < 0.9,
+                        created_at=created_at,
+                    )
+                )
+        with explicit_timestamps(Notification._meta.get_field("created_at")):
+            Notification.objects.bulk_create(notifications, batch_size=self.batch)
+        return len(notifications)
+
+    def seed_verifications(self):
+        # the verified code every user signed up with, plus abandoned codes that expired long ago
+        verifications = []
+        for i, user_id in enumerate(self.user_ids):
+            created_at = self.past(60)
+            email = f"{self.prefix}{letters(i)}@students.{self.prefix}a.edu"
+            verifications.append(
+                EmailVerification(
+                    username=f"{self.prefix}{letters(i)}",
+                    academic_email=email,
+                    code="000000",
+                    is_verified=True,
+                    created_at=created_at,
+                    expires_at=created_at + timedelta(minutes=10),
+                )
+            )
+            for j in range(heavy_tail(self.rnd, 1.5, 20)):
+                created_at = self.past(60)
+                verifications.append(
+                    EmailVerification(
+                        username=f"{self.prefix}{letters(i)}",
+                        academic_email=f"{self.prefix}{letters(i)}{letters(j)}@students.{self.prefix}a.edu",
+                        code="000000",
+                        created_at=created_at,
+                        expires_at=created_at + timedelta(minutes=10),
+                    )
+                )
+        with explicit_timestamps(EmailVerification._meta.get_field("created_at")):
+            EmailVerification.objects.bulk_create(verifications, batch_size=self.batch)
+        return len(verifications)
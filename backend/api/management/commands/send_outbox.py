@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ...outbox import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers the mail queued in the outbox over one SMTP connection, --batch-size mails at a time, "
+        "retrying failures with backoff. Polls every OUTBOX POLL_SECONDS until stopped, or drains once with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX["BATCH_SIZE"])
+        parser.add_argument("--once", action="store_true", help="send what is due and exit")
+
+    def handle(self, *args, **options):
+        worker = Worker(options["batch_size"])
+        try:
+            while True:
+                sent, failed = worker.run_once()
+                if sent or failed:
+                    self.stdout.write(f"sent {sent}, failed {failed}")
+                    continue
+                if options["once"]:
+                    break
+                connection.close_if_unusable_or_obsolete()
+                time.sleep(settings.OUTBOX["POLL_SECONDS"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
@@ -0,0 +1,117 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# in-process request metrics, rendered in the Prometheus text format by api/views/metrics.py
+# every worker process keeps its own numbers, Prometheus adds them up per instance
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.durations = {}
+        self.queries = {}
+        self.db_seconds = defaultdict(float)
+        # name -> (help, {labels: value}) for anything else the app wants to count
+        self.counters = {}
+        self.gauges = {}
+
+    def observe_request(self, view, method, status, seconds, queries, db_seconds):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            if view not in self.durations:
+                self.durations[view] = Histogram(DURATION_BUCKETS)
+                self.queries[view] = Histogram(QUERY_BUCKETS)
+            self.durations[view].observe(seconds)
+            self.queries[view].observe(queries)
+            self.db_seconds[view] += db_seconds
+
+    def inc(self, name, help_text, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            _, values = self.counters.setdefault(name, (help_text, defaultdict(float)))
+            values[key] += value
+
+    def gauge(self, name, help_text, read):
+        """Registers a callable read at render time, e.g. a queue depth."""
+        self.gauges[name] = (help_text, read)
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.durations.clear()
+            self.queries.clear()
+            self.db_seconds.clear()
+            self.counters.clear()
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP campus_http_requests_total Requests handled, by view, method and status.",
+                "# TYPE campus_http_requests_total counter",
+            ]
+            for (view, method, status), n in sorted(self.requests.items()):
+                lines.append(f'campus_http_requests_total{{view="{view}",method="{method}",status="{status}"}} {n}')
+
+            lines += self._histograms(
+                "campus_http_request_duration_seconds", "Wall time spent in the view stack.", self.durations
+            )
+            lines += self._histograms("campus_db_queries_per_request", "DB queries run per request.", self.queries)
+
+            lines += [
+                "# HELP campus_db_query_duration_seconds_total Time spent waiting on the database.",
+                "# TYPE campus_db_query_duration_seconds_total counter",
+            ]
+            for view, seconds in sorted(self.db_seconds.items()):
+                lines.append(f'campus_db_query_duration_seconds_total{{view="{view}"}} {seconds:.6f}')
+
+            for name, (help_text, values) in sorted(self.counters.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for labels, value in sorted(values.items()):
+                    lines.append(f"{name}{{{_labels(labels)}}} {value:g}" if labels else f"{name} {value:g}")
+
+            gauges = sorted(self.gauges.items())
+
+        for name, (help_text, read) in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {read():g}"]
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histograms(name, help_text, histograms):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for view, h in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {h.count}')
+            lines.append(f'{name}_sum{{view="{view}"}} {h.sum:.6f}')
+            lines.append(f'{name}_count{{view="{view}"}} {h.count}')
+        return lines
+
+
+registry = Registry()
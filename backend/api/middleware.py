@@ -0,0 +1,244 @@
+import time
+import zlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# the timer of the request being handled; a ContextVar so it follows the request into the
+# threads async views run their ORM calls in
+_timer = ContextVar("query_timer", default=None)
+
+
+class QueryTimer:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection (see api/signals.py), works with DEBUG off."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.seconds += time.perf_counter() - started
+        timer.count += 1
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route
+
+
+class MetricsMiddleware:
+    """Records request count, wall time, DB queries and DB time per URL name into api.metrics.registry."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def observe(self, request, response, seconds, timer):
+        registry.observe_request(
+            view_name(request), request.method, response.status_code, seconds, timer.count, timer.seconds
+        )
+
+
+class Gzip:
+    name = "gzip"
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        """(process, flush, finish) of a new compression stream."""
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 31: with the gzip header and trailer
+        return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+class Brotli:
+    name = "br"
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compressor(self):
+        c = brotli.Compressor(quality=self.quality)
+        return c.process, c.flush, c.finish
+
+
+def accepted_encodings(header):
+    """The codings of an Accept-Encoding header that are not refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compresses responses with brotli (if installed) or gzip, whichever the client accepts first in that
+    order. Only content types in COMPRESSION["CONTENT_TYPES"] and bodies of at least MIN_SIZE bytes;
+    streaming responses are compressed chunk by chunk. Bytes saved go to api.metrics.registry.
+
+    Views in COMPRESSION["SKIP_VIEWS"] are never compressed: their responses carry secrets (JWTs) next to
+    request input, and compressing those lets an attacker who can see sizes on the wire guess the
+    secret a byte at a time (BREACH)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = settings.COMPRESSION
+        self.min_size = options["MIN_SIZE"]
+        self.content_types = tuple(options["CONTENT_TYPES"])
+        self.skip_views = frozenset(options["SKIP_VIEWS"])
+        self.encoders = [Gzip(options["GZIP_LEVEL"])]
+        if brotli is not None:
+            self.encoders.insert(0, Brotli(options["BROTLI_QUALITY"]))
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        # compressing a page takes well under a millisecond, not worth a thread hop
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if not content_type.startswith(self.content_types):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        view = view_name(request)
+        if view in self.skip_views:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        encoder = next((e for e in self.encoders if e.name in accepted or "*" in accepted), None)
+        if encoder is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.acompress_stream(encoder, response.streaming_content, view)
+            else:
+                response.streaming_content = self.compress_stream(encoder, response.streaming_content, view)
+            del response.headers["Content-Length"]
+        else:
+            process, _, finish = encoder.compressor()
+            compressed = process(response.content) + finish()
+            if len(compressed) >= len(response.content):
+                return response
+            self.saved(view, encoder, len(response.content) - len(compressed))
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # the body differs per encoding now, so a strong ETag would be a lie (RFC 9110 8.8.1);
+        # If-None-Match compares weakly, so conditional GETs still match
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoder.name
+        return response
+
+    def compress_stream(self, encoder, chunks, view):
+        process, flush, finish = encoder.compressor()
+        raw = sent = 0
+        for chunk in chunks:
+            # flushed per chunk, so each one reaches the client as soon as it is produced
+            data = process(chunk) + flush()
+            raw, sent = raw + len(chunk), sent + len(data)
+            yield data
+        data = finish()
+        self.saved(view, encoder, raw - sent - len(data))
+        yield data
+
+    async def acompress_stream(self, encoder, chunks, view):
+        process, flush, finish = encoder.compressor()
+        raw = sent = 0
+        async for chunk in chunks:
+            data = process(chunk) + flush()
+            raw, sent = raw + len(chunk), sent + len(data)
+            yield data
+        data = finish()
+        self.saved(view, encoder, raw - sent - len(data))
+        yield data
+
+    @staticmethod
+    def saved(view, encoder, n):
+        # a stream of small chunks can come out larger than it went in, that saved nothing
+        registry.inc(
+            "campus_http_compression_saved_bytes_total",
+            "Response bytes saved by compression, by view and encoding.",
+            max(n, 0),
+            view=view,
+            encoding=encoder.name,
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_messagemedia_media_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('score', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(db_column='post_id', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='api.post')),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'feed_entry',
+                'indexes': [models.Index(fields=['user', '-score', '-created_at', '-post'], name='feed_entry_user_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post'), name='uniq_feed_entry_user_post')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing_rows(apps, schema_editor):
+    Post = apps.get_model('api', 'Post')
+    Comment = apps.get_model('api', 'Comment')
+    PostReaction = apps.get_model('api', 'PostReaction')
+    CommentReaction = apps.get_model('api', 'CommentReaction')
+
+    def count_of(model, fk):
+        rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+    Post.objects.update(
+        reactions_count=count_of(PostReaction, 'post'),
+        comments_count=count_of(Comment, 'post'),
+    )
+    Comment.objects.update(
+        reactions_count=count_of(CommentReaction, 'comment'),
+        replies_count=count_of(Comment, 'parent_comment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reactions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reactions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emailverification',
+            name='email_verif_academi_1a8b83_idx',
+        ),
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(
+                fields=['academic_email', '-created_at'],
+                name='email_verif_email_created_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(fields=['expires_at'], name='email_verif_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(
+                fields=['conversation', '-sent_at'],
+                name='message_conversation_sent_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(
+                condition=models.Q(('is_read', False)),
+                fields=['user', '-created_at'],
+                name='notification_user_unread_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def clear_feed_entries(apps, schema_editor):
+    # the old scores have engagement and freshness baked in; emptied feeds are rebuilt on the next visit
+    apps.get_model("api", "FeedEntry").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_outbox_email"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="feedentry",
+            name="feed_entry_user_rank_idx",
+        ),
+        migrations.RenameField(
+            model_name="feedentry",
+            old_name="score",
+            new_name="affinity",
+        ),
+        migrations.RunPython(clear_feed_entries, migrations.RunPython.noop),
+    ]
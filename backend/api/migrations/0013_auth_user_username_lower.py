@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # send_code checks usernames case-insensitively, on lower(username); auth_user belongs to
+    # django.contrib.auth, so its index is created here
+    dependencies = [
+        ("api", "0012_feed_entry_affinity"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_username_lower_idx ON auth_user (LOWER("username"))',
+            "DROP INDEX auth_user_username_lower_idx",
+        ),
+    ]
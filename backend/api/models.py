@@ -35,6 +35,17 @@ def validate_exactly_one(instance, field_a, field_b):
         raise ValidationError(f"Exactly one of '{field_a}' or '{field_b}' must be set.")
 
 
+def without_counters(instance, counters, kwargs):
+    """save() kwargs that leave the counters out when an existing row is saved (e.g. edited in the admin):
+    they only change through atomic UPDATEs (api/counters.py), the values in memory may be stale."""
+    if instance._state.adding or kwargs.get("force_insert"):
+        return kwargs
+    update_fields = kwargs.get("update_fields")
+    if update_fields is None:
+        update_fields = [f.name for f in instance._meta.concrete_fields if not f.primary_key]
+    return {**kwargs, "update_fields": [name for name in update_fields if name not in counters]}
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -58,6 +69,13 @@ class UserProfile(models.Model):
 
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.ONLINE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # part of auth/me's ETag
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # home feed bookkeeping (api/feed/fanout.py): the feed is rebuilt on read when it never was,
+    # or when the user joined or left a community or (un)followed a page since
+    feed_rebuilt_at = models.DateTimeField(null=True, blank=True)
+    feed_sources_changed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "user_profile"
@@ -86,7 +104,43 @@ class EmailVerification(models.Model):
     class Meta:
         db_table = "email_verification"
         indexes = [
-            models.Index(fields=["academic_email"]),
+            # latest code for an email (send_code, verify_code, signup)
+            models.Index(fields=["academic_email", "-created_at"], name="email_verif_email_created_idx"),
+            # purging expired codes
+            models.Index(fields=["expires_at"], name="email_verif_expires_idx"),
+        ]
+
+
+class OutboxEmail(models.Model):
+    """Mail waiting to be sent by the send_outbox worker (api/outbox.py)."""
+
+    id = models.BigAutoField(primary_key=True)
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # when a worker may (re)try it: backoff after a failure, a lease while a worker is sending it
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # sent_at - created_at, in milliseconds
+    delivery_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = "outbox_email"
+        indexes = [
+            # the worker's queue: due pending mail, oldest first
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_email_due_idx"),
         ]
 
 
@@ -298,6 +352,13 @@ class Notification(models.Model):
 
     class Meta:
         db_table = "notification"
+        # a user's unread notifications, newest first. Partial rather than (user, is_read, created_at):
+        # is_read=False is compiled to `NOT is_read`, which SQLite can't match against an index column
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], condition=Q(is_read=False), name="notification_user_unread_idx"
+            ),
+        ]
 
 
 class Community(models.Model):
@@ -408,6 +469,8 @@ class Post(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # also moved forward by every counter bump, so it changes whenever the post's feed item does
+    updated_at = models.DateTimeField(auto_now=True)
 
     author_user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -435,15 +498,27 @@ class Post(models.Model):
         db_column="community_id",
     )
 
+    # kept up to date by api/signals.py, fixed by the reconcile_counters command if they drift
+    reactions_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    COUNTERS = ("reactions_count", "comments_count")
+
     def clean(self):
         validate_exactly_one(self, "author_user", "author_page")
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        super().save(*args, **without_counters(self, self.COUNTERS, kwargs))
 
     class Meta:
         db_table = "post"
+        # one per candidate source of the feed (see api/feed/candidates.py)
+        indexes = [
+            models.Index(fields=["-created_at"], name="post_created_idx"),
+            models.Index(fields=["author_page", "-created_at"], name="post_author_page_created_idx"),
+            models.Index(fields=["community", "-created_at"], name="post_community_created_idx"),
+            models.Index(fields=["author_user", "-created_at"], name="post_author_user_created_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=(
@@ -517,12 +592,16 @@ class Comment(models.Model):
         db_column="parent_comment_id",
     )
 
+    replies_count = models.PositiveIntegerField(default=0)
+    reactions_count = models.PositiveIntegerField(default=0)
+    COUNTERS = ("replies_count", "reactions_count")
+
     def clean(self):
         validate_exactly_one(self, "author_user", "author_page")
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        super().save(*args, **without_counters(self, self.COUNTERS, kwargs))
 
     class Meta:
         db_table = "comment"
@@ -668,6 +747,30 @@ class FollowPage(models.Model):
         ]
 
 
+# materialized home feed, one row per (user, post) filled by fan-out on write (see api/feed/fanout.py)
+class FeedEntry(models.Model):
+    id = models.BigAutoField(primary_key=True)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="feed_entries", db_column="user_id"
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="feed_entries", db_column="post_id")
+
+    # the points the post gets from its source (university, community, followed page); engagement
+    # and freshness change over time and are added when the feed is read (api/feed/scoring.py)
+    affinity = models.IntegerField(default=0)
+    # copy of post.created_at, so freshness needs no join
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "feed_entry"
+        constraints = [
+            # also the index a feed is read through: fan_out_post trims every feed it writes to back to
+            # FEED_MAX_ENTRIES rows, so a read ranks (and sorts) at most that many
+            models.UniqueConstraint(fields=["user", "post"], name="uniq_feed_entry_user_post"),
+        ]
+
+
 class Conversation(models.Model):
     conversation_id = models.BigAutoField(primary_key=True, db_column="conversation_id")
 
@@ -785,6 +888,10 @@ class Message(models.Model):
 
     class Meta:
         db_table = "message"
+        # a conversation's messages, newest first
+        indexes = [
+            models.Index(fields=["conversation", "-sent_at"], name="message_conversation_sent_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=(
@@ -0,0 +1,115 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import registry
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# refusals of one message; the connection is still good for the next
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+# Outbound mail goes through the outbox_email table: views enqueue() a row (in their own transaction,
+# so mail is only sent for work that committed) and the send_outbox worker delivers due rows in
+# batches over one SMTP connection, retrying failures with exponential backoff. A worker claims a
+# batch by pushing its next_attempt_at forward by LEASE_SECONDS; if it dies mid-batch, those rows
+# come due again and are sent by the next worker, so delivery is at least once.
+
+
+def enqueue(to, subject, body):
+    return OutboxEmail.objects.create(to=to, subject=subject, body=body)
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: BACKOFF_SECONDS, doubling, at most an hour."""
+    return min(settings.OUTBOX["BACKOFF_SECONDS"] * 2 ** (attempts - 1), 3600)
+
+
+def claim(batch_size, now=None):
+    """Takes up to batch_size due mails away from other workers for LEASE_SECONDS and returns them."""
+    now = now or timezone.now()
+    lease = now + timedelta(seconds=settings.OUTBOX["LEASE_SECONDS"])
+    with transaction.atomic():
+        due = OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+        ids = list(due.order_by("next_attempt_at").values_list("id", flat=True)[:batch_size])
+        # only the rows still due: another worker may have claimed some since the SELECT
+        OutboxEmail.objects.filter(id__in=ids, next_attempt_at__lte=now).update(next_attempt_at=lease)
+        return list(OutboxEmail.objects.filter(id__in=ids, next_attempt_at=lease).order_by("id"))
+
+
+class Worker:
+    """Delivers the outbox over one SMTP connection, opened on the first mail and kept while there is work."""
+
+    def __init__(self, batch_size=None, connection=None):
+        self.batch_size = batch_size or settings.OUTBOX["BATCH_SIZE"]
+        self.connection = connection or get_connection(fail_silently=False)
+        self.is_open = False
+
+    def run_once(self):
+        """Sends one batch. Returns (sent, failed)."""
+        batch = claim(self.batch_size)
+        if not batch:
+            self.close()
+            return 0, 0
+        sent = failed = 0
+        for mail in batch:
+            if self.send(mail):
+                sent += 1
+            else:
+                failed += 1
+        return sent, failed
+
+    def send(self, mail):
+        try:
+            message = EmailMessage(mail.subject, mail.body, settings.DEFAULT_FROM_EMAIL, [mail.to])
+            if not self.is_open:
+                self.connection.open()
+                self.is_open = True
+            self.connection.send_messages([message])
+        except OSError as e:  # smtplib.SMTPException included
+            if not isinstance(e, MESSAGE_ERRORS):
+                # the connection is gone or unusable, the next mail opens a new one
+                self.close()
+            self.failed(mail, e)
+            return False
+        except Exception as e:
+            # the message itself is broken (e.g. a newline in the address, a ValueError): retrying
+            # cannot help, and letting it escape would stop the worker on the same mail every time
+            self.failed(mail, e, permanent=True)
+            return False
+
+        now = timezone.now()
+        delivery_ms = int((now - mail.created_at).total_seconds() * 1000)
+        OutboxEmail.objects.filter(id=mail.id).update(
+            status=OutboxEmail.Status.SENT, attempts=mail.attempts + 1, sent_at=now, delivery_ms=delivery_ms
+        )
+        registry.inc("campus_outbox_sent_total", "Outbox mails delivered.")
+        registry.inc(
+            "campus_outbox_delivery_seconds_total", "Enqueue to delivery time of sent mails.", delivery_ms / 1000
+        )
+        return True
+
+    def failed(self, mail, error, permanent=False):
+        attempts = mail.attempts + 1
+        gave_up = permanent or attempts >= settings.OUTBOX["MAX_ATTEMPTS"]
+        OutboxEmail.objects.filter(id=mail.id).update(
+            status=OutboxEmail.Status.FAILED if gave_up else OutboxEmail.Status.PENDING,
+            attempts=attempts,
+            next_attempt_at=timezone.now() + timedelta(seconds=backoff(attempts)),
+            last_error=repr(error),
+        )
+        registry.inc("campus_outbox_failures_total", "Outbox delivery attempts that failed.", gave_up=str(gave_up))
+        logger.warning("outbox mail %s to %s failed (attempt %s): %r", mail.id, mail.to, attempts, error)
+
+    def close(self):
+        if self.is_open:
+            try:
+                self.connection.close()
+            finally:
+                self.is_open = False
@@ -0,0 +1,69 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .metrics import registry
+from .models import EmailVerification
+
+logger = logging.getLogger(__name__)
+
+# Expired verification codes are deleted here, in chunks walked along email_verif_expires_idx, by the
+# purge_verifications command (cron) or by a PurgeScheduler thread in each web process. Every chunk
+# is its own short transaction, so signups are never stuck behind one big DELETE.
+
+
+def purge_expired_verifications(batch_size=500, now=None):
+    """Deletes every EmailVerification that expired before `now`, batch_size rows at a time. Returns the count."""
+    now = now or timezone.now()
+    expired = EmailVerification.objects.filter(expires_at__lt=now).order_by("expires_at")
+    deleted = 0
+    while True:
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            deleted += EmailVerification.objects.filter(id__in=ids).delete()[0]
+    if deleted:
+        registry.inc("campus_verifications_purged_total", "Expired email verification codes deleted.", deleted)
+    return deleted
+
+
+class PurgeScheduler:
+    """Runs purge_expired_verifications every interval seconds on a daemon thread. Several processes
+    running one each is fine: a row deleted by another is simply not found."""
+
+    def __init__(self, interval, batch_size=500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.VERIFICATION_PURGE
+        return cls(options["INTERVAL_SECONDS"], options["BATCH_SIZE"])
+
+    def start(self):
+        """Starts the thread once, if an interval is configured. Called by backend/wsgi.py and backend/asgi.py."""
+        if self.thread is not None or not self.interval:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="verification-purge", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                purge_expired_verifications(self.batch_size)
+            except Exception:
+                logger.exception("verification purge failed")
+            finally:
+                connection.close()
+
+
+scheduler = PurgeScheduler.from_settings()
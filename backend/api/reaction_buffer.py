@@ -0,0 +1,240 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from itertools import count
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .counters import bump
+from .feed import cache as feed_cache
+from .metrics import registry
+from .reactions import POST, TARGETS
+
+logger = logging.getLogger(__name__)
+
+# Coalesces reactions in memory and writes them in one transaction every FLUSH_INTERVAL_MS (or
+# MAX_EVENTS pending reactions): one bulk insert, one delete and one counter UPDATE per post or
+# comment, instead of a transaction per tap that all queue on the same hot row.
+#
+# Crash safety: every event is appended to a journal file before add() returns. A flush seals
+# the journal segment, and the segment is deleted only after the flush commits. A crash loses
+# nothing: segments left behind by a dead process are replayed by the next buffer to start.
+# Replaying is safe because flushes are idempotent: a reaction that is already there is not
+# inserted (or counted) again, a missing one is not deleted again.
+
+
+class ReactionBuffer:
+    def __init__(self, flush_interval_ms=100, max_events=1000, journal_dir=None):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.journal_dir = journal_dir
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        # (target name, pk, user id) -> True to react, False to unreact; the last event wins
+        self.pending = {}
+        # journal segments whose events are in self.pending or in the flush underway
+        self.sealed = []
+        self.journal = None
+        self.segments = count()
+        self.thread = None
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.REACTION_BUFFER
+        return cls(options["FLUSH_INTERVAL_MS"], options["MAX_EVENTS"], options["JOURNAL_DIR"])
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            if self.journal_dir:
+                os.makedirs(self.journal_dir, exist_ok=True)
+                self.replay_orphans()
+                self.open_segment()
+            self.thread = threading.Thread(target=self.run, name="reaction-buffer", daemon=True)
+            self.thread.start()
+        atexit.register(self.flush)
+
+    def add(self, target, pk, user_id, reacted=True):
+        if self.thread is None:
+            self.start()
+        event = (target.name, pk, user_id)
+        with self.lock:
+            if self.journal is not None:
+                self.journal.write(json.dumps([*event, reacted]) + "\n")
+            self.pending[event] = reacted
+            full = len(self.pending) >= self.max_events
+        if full:
+            self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # the events stay pending and the journal stays on disk, the next flush retries
+                logger.exception("reaction buffer flush failed")
+                connection.close_if_unusable_or_obsolete()
+
+    # journal
+
+    def segment_path(self, n):
+        return os.path.join(self.journal_dir, f"reactions-{os.getpid()}-{n}.jsonl")
+
+    def open_segment(self):
+        # line buffered: each event reaches the OS as soon as it is written
+        self.journal = open(self.segment_path(next(self.segments)), "a", buffering=1)
+
+    def seal_segment(self):
+        """Called with self.lock held: closes the current segment and starts the next one."""
+        if self.journal is None:
+            return
+        # line buffering only hands the events to the OS; fsync so a sealed segment survives a power cut
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal.close()
+        self.sealed.append(self.journal.name)
+        self.open_segment()
+
+    def replay_orphans(self):
+        # oldest segment first, so that a later event for the same reaction wins
+        segments = sorted((key, name) for name in os.listdir(self.journal_dir) if (key := _segment_key(name)))
+        for (_, pid), name in segments:
+            # our own pid too: nothing is journaled before start(), so that file is from an
+            # earlier process that had the same pid (pid 1 in a restarted container)
+            if pid != os.getpid() and _alive(pid):
+                continue
+            # claim it first, so two buffers starting together do not both replay it
+            claimed = self.segment_path(f"replay-{name}")
+            try:
+                os.rename(os.path.join(self.journal_dir, name), claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as f:
+                for line in f:
+                    # a torn last line is an event whose add() never returned
+                    try:
+                        *event, reacted = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.pending[tuple(event)] = reacted
+            self.sealed.append(claimed)
+
+    # flushing
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                # every journaled event is pending until it is flushed, so nothing pending means nothing to do
+                if not self.pending:
+                    return
+                batch, self.pending = self.pending, {}
+                self.seal_segment()
+                segments, self.sealed = self.sealed, []
+            try:
+                write(batch)
+            except Exception:
+                with self.lock:
+                    # newer events for the same reaction win over the ones we failed to write
+                    self.pending = {**batch, **self.pending}
+                    self.sealed = segments + self.sealed
+                raise
+            self.remove(segments)
+            registry.inc(
+                "campus_reaction_buffer_events_total", "Reaction events written by buffer flushes.", len(batch)
+            )
+
+    @staticmethod
+    def remove(segments):
+        for path in segments:
+            os.remove(path)
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def _segment_key(name):
+    """((pid, number) of the segment the events were first written to, owner pid) for a journal file,
+    None for anything else. Numbers compare as numbers: as text reactions-42-10 sorts before reactions-42-2."""
+    parts = name.removesuffix(".jsonl").split("-")
+    if parts[0] != "reactions" or len(parts) < 3:
+        return None
+    owner = int(parts[1])
+    # a claimed segment is reactions-<claimer>-replay-<original name>
+    while parts[2] == "replay":
+        parts = parts[3:]
+    return (int(parts[1]), int(parts[2])), owner
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write(batch):
+    """Applies one batch of coalesced events in a single transaction. Returns the rows changed."""
+    by_target = defaultdict(list)
+    for (name, pk, user_id), reacted in batch.items():
+        by_target[TARGETS[name]].append((pk, user_id, reacted))
+
+    changed = 0
+    with transaction.atomic():
+        for target, events in by_target.items():
+            changed += _write_target(target, events)
+    return changed
+
+
+def _write_target(target, events):
+    # reactions to posts/comments deleted in the meantime are dropped
+    pks = {pk for pk, _, _ in events}
+    pks = set(target.model.objects.filter(pk__in=pks).values_list("pk", flat=True))
+    events = [e for e in events if e[0] in pks]
+    if not events:
+        return 0
+
+    # the reactions among this batch that exist already, so only real changes are counted; read in the
+    # flush's write transaction, which on SQLite nobody else can change under us
+    rows = target.reaction.objects.filter(
+        **{f"{target.fk_name}__in": pks, "user_id__in": {user_id for _, user_id, _ in events}}
+    ).values_list("pk", target.fk_name + "_id", "user_id")
+    present = {(pk, user_id): row_pk for row_pk, pk, user_id in rows}
+
+    added, removed = [], []
+    deltas = defaultdict(int)
+    for pk, user_id, reacted in events:
+        exists = (pk, user_id) in present
+        if reacted and not exists:
+            added.append(target.reaction(**{target.fk_name + "_id": pk, "user_id": user_id}))
+            deltas[pk] += 1
+        elif not reacted and exists:
+            removed.append(present[(pk, user_id)])
+            deltas[pk] -= 1
+
+    # neither statement sends signals: the counters move once per post or comment below, not per row
+    # (QuerySet.delete() would run the post_delete receivers of api/signals.py for every reaction)
+    target.reaction.objects.bulk_create(added, ignore_conflicts=True)
+    if removed:
+        target.reaction.objects.filter(pk__in=removed)._raw_delete(target.reaction.objects.db)
+
+    for pk, delta in deltas.items():
+        if delta:
+            bump(target.model, pk, target.counter, delta)
+            if target is POST:
+                transaction.on_commit(lambda pk=pk: feed_cache.invalidate_post_readers(pk))
+    return len(added) + len(removed)
+
+
+buffer = ReactionBuffer.from_settings()
+registry.gauge("campus_reaction_buffer_pending", "Reaction events waiting for the next flush.", lambda: len(buffer))
@@ -0,0 +1,104 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .feed import cache as feed_cache
+from .models import Comment, CommentReaction, Post, PostReaction
+
+# Reactions written with one statement each instead of Model.save(): full_clean() would run an
+# exists() query first, while the partial unique constraints already reject duplicates.
+# The post_save/post_delete counter signals do not fire for these, so the counter is moved here,
+# in the same transaction.
+
+
+class Target:
+    """A reactable model: its reaction table, the foreign key to it and its counter column."""
+
+    def __init__(self, model, reaction, fk, counter="reactions_count"):
+        self.name = model._meta.model_name
+        self.model = model
+        self.reaction = reaction
+        self.fk_name = fk
+        self.fk = reaction._meta.get_field(fk).column
+        self.counter = counter
+        self.touch = any(f.name == "updated_at" for f in model._meta.concrete_fields)
+
+
+POST = Target(Post, PostReaction, "post")
+COMMENT = Target(Comment, CommentReaction, "comment")
+TARGETS = {t.name: t for t in (POST, COMMENT)}
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def _bump(cursor, target, pk, delta):
+    """`counter = max(counter + delta, 0)` on the target row, returning the new value (None if no such row)."""
+    greatest = "MAX" if connection.vendor == "sqlite" else "GREATEST"
+    sets = [f"{_q(target.counter)} = {greatest}({_q(target.counter)} + %s, 0)"]
+    params = [delta]
+    if target.touch:
+        sets.append(f"{_q('updated_at')} = %s")
+        params.append(connection.ops.adapt_datetimefield_value(timezone.now()))
+    cursor.execute(
+        f"UPDATE {_q(target.model._meta.db_table)} SET {', '.join(sets)} "
+        f"WHERE {_q(target.model._meta.pk.column)} = %s RETURNING {_q(target.counter)}",
+        [*params, pk],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _count(cursor, target, pk):
+    cursor.execute(
+        f"SELECT {_q(target.counter)} FROM {_q(target.model._meta.db_table)} "
+        f"WHERE {_q(target.model._meta.pk.column)} = %s",
+        [pk],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _changed(target, pk):
+    if target is POST:
+        transaction.on_commit(lambda: feed_cache.invalidate_post_readers(pk))
+
+
+def react(target, pk, user_id):
+    """Adds the user's reaction, a no-op if it is already there. Returns (added, new count), the count
+    is None when the post/comment does not exist."""
+    table = _q(target.reaction._meta.db_table)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({_q(target.fk)}, {_q('user_id')}) VALUES (%s, %s) "
+                f"ON CONFLICT DO NOTHING RETURNING {_q(target.reaction._meta.pk.column)}",
+                [pk, user_id],
+            )
+            if cursor.fetchone() is None:
+                # already reacted, so the target exists
+                return False, _count(cursor, target, pk)
+            count = _bump(cursor, target, pk, 1)
+            if count is None:
+                # the foreign key is deferred: undo the insert instead of failing at commit
+                raise target.model.DoesNotExist
+            _changed(target, pk)
+    except target.model.DoesNotExist:
+        return False, None
+    return True, count
+
+
+def unreact(target, pk, user_id):
+    """Removes the user's reaction, a no-op if there is none. Returns (removed, new count)."""
+    table = _q(target.reaction._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {_q(target.fk)} = %s AND {_q('user_id')} = %s "
+            f"RETURNING {_q(target.reaction._meta.pk.column)}",
+            [pk, user_id],
+        )
+        if cursor.fetchone() is None:
+            return False, _count(cursor, target, pk)
+        count = _bump(cursor, target, pk, -1)
+        _changed(target, pk)
+    return True, count
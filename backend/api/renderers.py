@@ -0,0 +1,71 @@
+import json
+from datetime import date, datetime, time
+from uuid import UUID
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# JSON in and out of the API through orjson when it is installed, the stdlib otherwise. Both write
+# datetimes as isoformat() does, so views can hand over datetimes as they come from the database.
+
+# what orjson does not know natively (Decimal, lazy translations, querysets...), the way DRF does it
+_default = JSONEncoder().default
+
+
+def _stdlib_default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    return _default(obj)
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, default=_stdlib_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+if orjson is not None:
+
+    def dumps(data):
+        try:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson (before 3.9) refuses datetimes with a fixed-offset tzinfo, e.g. from parse_datetime();
+            # anything really unserializable fails again, with the same error, in the stdlib
+            return stdlib_dumps(data)
+
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+else:  # pragma: no cover
+    dumps = stdlib_dumps
+    loads = json.loads
+    DecodeError = ValueError
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Drop-in for DRF's JSONRenderer. Indented output (the `indent` media type parameter) is left
+    to DRF, orjson only knows one indentation."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except DecodeError as e:
+            raise ParseError(f"JSON parse error - {e}")
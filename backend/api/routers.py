@@ -0,0 +1,91 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Reads go to a replica only inside read_from_replica() (the @replica_reads views, admin
+# changelists). Everything else, every write, and every read after a write or inside a
+# transaction stays on the primary, so a request always sees its own writes. The router always
+# names the primary instead of returning None: Django would otherwise follow the instance hint and
+# save (or lazily load from) the replica an instance was read from, e.g. the cached request.user.
+
+
+class _ReplicaReads:
+    __slots__ = ("alias", "wrote")
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.wrote = False
+
+
+_current = ContextVar("replica_reads", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextmanager
+def read_from_replica():
+    """Sends this block's reads to one replica (picked once, so the reads are consistent)."""
+    aliases = replicas()
+    if not aliases or _current.get() is not None:
+        yield
+        return
+    token = _current.set(_ReplicaReads(random.choice(aliases)))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def replica_reads(view):
+    """View decorator for read-only endpoints, sync or async. Put it above @api_view (@async_api_view) so
+    authentication reads are covered too."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            with read_from_replica():
+                return await view(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            with read_from_replica():
+                return view(request, *args, **kwargs)
+
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None:
+            return DEFAULT_DB_ALIAS
+        if state.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas get their schema from the primary
+        return False if db in replicas() else None
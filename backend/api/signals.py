@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_user
+from .blacklist import blacklist, bump_generation
+from .counters import bump
+from .feed import cache as feed_cache
+from .feed.fanout import fan_out_post
+from .middleware import time_queries
+from .models import (
+    Comment,
+    CommentReaction,
+    CommunityMember,
+    FeedEntry,
+    FollowPage,
+    Instructor,
+    Post,
+    PostReaction,
+    Student,
+    UserProfile,
+)
+
+User = get_user_model()
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # permanent, so queries in any thread count towards the current request (a no-op outside requests)
+    connection.execute_wrappers.append(time_queries)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed_cache.invalidate_users(fan_out_post(instance)))
+    else:
+        transaction.on_commit(lambda: feed_cache.invalidate_post_readers(instance.post_id))
+
+
+@receiver(pre_delete, sender=Post)
+def post_removed(sender, instance, **kwargs):
+    # feed entries are gone by the time post_delete runs, so collect the readers now
+    readers = list(FeedEntry.objects.filter(post_id=instance.post_id).values_list("user_id", flat=True))
+    transaction.on_commit(lambda: feed_cache.invalidate_users(readers))
+
+
+# engagement counters
+
+
+@receiver(post_save, sender=PostReaction)
+def post_reaction_added(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, "reactions_count", 1)
+        transaction.on_commit(lambda: feed_cache.invalidate_post_readers(instance.post_id))
+
+
+@receiver(post_delete, sender=PostReaction)
+def post_reaction_removed(sender, instance, **kwargs):
+    bump(Post, instance.post_id, "reactions_count", -1)
+    transaction.on_commit(lambda: feed_cache.invalidate_post_readers(instance.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_added(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, "comments_count", 1)
+        if instance.parent_comment_id:
+            bump(Comment, instance.parent_comment_id, "replies_count", 1)
+        transaction.on_commit(lambda: feed_cache.invalidate_post_readers(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_removed(sender, instance, **kwargs):
+    bump(Post, instance.post_id, "comments_count", -1)
+    if instance.parent_comment_id:
+        bump(Comment, instance.parent_comment_id, "replies_count", -1)
+    transaction.on_commit(lambda: feed_cache.invalidate_post_readers(instance.post_id))
+
+
+@receiver(post_save, sender=CommentReaction)
+def comment_reaction_added(sender, instance, created, **kwargs):
+    if created:
+        bump(Comment, instance.comment_id, "reactions_count", 1)
+
+
+@receiver(post_delete, sender=CommentReaction)
+def comment_reaction_removed(sender, instance, **kwargs):
+    bump(Comment, instance.comment_id, "reactions_count", -1)
+
+
+# feed sources
+
+
+@receiver(post_save, sender=CommunityMember)
+@receiver(post_delete, sender=CommunityMember)
+@receiver(post_save, sender=FollowPage)
+@receiver(post_delete, sender=FollowPage)
+def feed_sources_changed(sender, instance, **kwargs):
+    # the next feed read rebuilds (views/posts.py), so does rebuild_feed --changed-since
+    UserProfile.objects.filter(user_id=instance.user_id).update(feed_sources_changed_at=timezone.now())
+
+    def invalidate():
+        invalidate_user(instance.user_id)
+        feed_cache.invalidate_users([instance.user_id])
+
+    transaction.on_commit(invalidate)
+
+
+# cached users (api/authentication.py)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Instructor)
+@receiver(post_delete, sender=Instructor)
+def cached_user_changed(sender, instance, **kwargs):
+    user_id = instance.pk if sender is User else instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+# JWT blacklist (api/blacklist.py)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        jti = instance.token.jti
+
+        def added():
+            blacklist.add(jti)
+            bump_generation()
+
+        transaction.on_commit(added)
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def token_unblacklisted(sender, instance, **kwargs):
+    jti = instance.token.jti
+
+    def forgotten():
+        blacklist.forget(jti)
+        bump_generation()
+
+    transaction.on_commit(forgotten)
@@ -0,0 +1,63 @@
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# SQLite allows one writer per database file. With SERIALIZE_WRITES on, the write transactions of
+# this process queue up behind one lock per file instead of all polling SQLite's busy handler at
+# once, which is where "database is locked" comes from under load. Only transactions (atomic
+# blocks) are queued; single autocommit statements still rely on the busy timeout.
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def write_lock(name):
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.held_write_lock = None
+
+    def _acquire_write_lock(self):
+        if not self.settings_dict.get("SERIALIZE_WRITES") or self.is_in_memory_db():
+            return
+        lock = write_lock(self.settings_dict["NAME"])
+        # wait no longer than SQLite itself would
+        if not lock.acquire(timeout=self.settings_dict["OPTIONS"].get("timeout", 5)):
+            raise OperationalError("database is locked (timed out in the write queue)")
+        self.held_write_lock = lock
+
+    def _release_write_lock(self):
+        if self.held_write_lock is not None:
+            self.held_write_lock.release()
+            self.held_write_lock = None
+
+    def _start_transaction_under_autocommit(self):
+        self._acquire_write_lock()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
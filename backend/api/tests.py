@@ -1,3 +1,1252 @@
-# from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import warnings
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from inspect import iscoroutinefunction
+from io import BytesIO, StringIO
+from uuid import UUID
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.decorators import permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import hashing, reactions
+from .async_views import async_api_view
+from .blacklist import blacklist, bump_generation
+from .counters import bump
+from .feed import cache as feed_cache
+from .feed.cursor import decode_cursor, encode_cursor
+from .feed.fanout import rebuild_user_feed
+from .feed.ranking import rank
+from .feed.scoring import FeedSources, annotate_scores, get_weights
+from .management.commands.import_campus import Command as ImportCampusCommand
+from .metrics import Registry
+from .middleware import CompressionMiddleware
+from .models import (
+    Comment,
+    CommentReaction,
+    Community,
+    CommunityMember,
+    EmailVerification,
+    FeedEntry,
+    FollowPage,
+    OutboxEmail,
+    Page,
+    Post,
+    PostMedia,
+    PostReaction,
+    Student,
+    UniversityDomain,
+    UserProfile,
+)
+from .outbox import Worker
+from .purge import purge_expired_verifications
+from .purge import scheduler as purge_scheduler
+from .reaction_buffer import ReactionBuffer
+from .renderers import FastJSONParser, FastJSONRenderer, stdlib_dumps
+from .routers import read_from_replica
+from .sqlite.base import write_lock
+from .throttling import LoginIPThrottle
+from .tokens import RefreshToken
+from .views.auth.me import me
+from .views.posts import feed
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.uni = Page.objects.create(page_name="PTUK", page_type=Page.PageType.UNIVERSITY)
+        self.user = User.objects.create_user(username="alice", password="pw")
+        UserProfile.objects.create(user=self.user)
+        Student.objects.create(user=self.user, university_page=self.uni)
+
+        self.author = User.objects.create_user(username="bob", password="pw")
+        UserProfile.objects.create(user=self.author, profile_image="profiles/bob.png")
+
+        self.client = APIClient()
+        # authenticated by the token, so the user is loaded (and cached) the way it is in production
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def make_posts(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                page_post = Post.objects.create(author_page=self.uni, content_text=f"page {i}")
+                PostMedia.objects.create(post=page_post, media_type="image", media_file="messages/b.png", order_index=1)
+                PostMedia.objects.create(post=page_post, media_type="url", media_url="https://x.ps/a", order_index=0)
+                Post.objects.create(author_user=self.author, content_text=f"user {i}")
+        # bob's posts reach alice through the global window, not through fan-out
+        rebuild_user_feed(self.user)
+
+    def get_feed(self, limit):
+        cache.clear()
+        # user, feed version, feed entries, media, posts with their authors
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/posts/feed/", {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.make_posts(10)
+        small = self.get_feed(2)
+        large = self.get_feed(20)
+        self.assertEqual(len(small["results"]), 2)
+        self.assertEqual(len(large["results"]), 20)
+
+    def test_items(self):
+        self.make_posts(1)
+        Post.objects.filter(author_user=self.author).update(reactions_count=3, comments_count=1)
+        data = self.get_feed(10)
+
+        by_author = {item["author_username"]: item for item in data["results"]}
+        page_item, user_item = by_author["PTUK"], by_author["bob"]
+
+        self.assertEqual(page_item["tag"], "university")
+        self.assertEqual(
+            page_item["media"],
+            [
+                {"type": "url", "url": "https://x.ps/a"},
+                {"type": "image", "url": "http://testserver/media/messages/b.png"},
+            ],
+        )
+        self.assertEqual(user_item["author_avatar"], "http://testserver/media/profiles/bob.png")
+        self.assertEqual(user_item["likes_count"], 3)
+        self.assertEqual(user_item["comments_count"], 1)
+
+    def test_unchanged_feed_is_not_modified(self):
+        self.make_posts(1)
+        etag = self.client.get("/api/posts/feed/")["ETag"]
+
+        cache.clear()
+        # only the user and the version, the page is not read
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/posts/feed/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PostReaction.objects.create(post=Post.objects.filter(author_page=self.uni).get(), user=self.user)
+        response = self.client.get("/api/posts/feed/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_removed_post_changes_etag(self):
+        self.make_posts(2)
+        response = self.client.get("/api/posts/feed/")
+        self.assertNotIn("Last-Modified", response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.filter(author_page=self.uni).first().delete()
+        response = self.client.get("/api/posts/feed/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_compressed_feed_is_not_modified(self):
+        self.make_posts(5)
+        etag = self.client.get("/api/posts/feed/", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+        response = self.client.get("/api/posts/feed/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def assertInvalidates(self, change):
+        """The feed page is served from the cache until `change` commits, and read again after."""
+        self.client.get("/api/posts/feed/")
+        feed_cache.stats(reset=True)
+        self.client.get("/api/posts/feed/")
+        self.assertEqual(feed_cache.stats(reset=True)["hits"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.client.get("/api/posts/feed/")
+        self.assertEqual(feed_cache.stats()["misses"], 1)
+
+    def test_post_changes_invalidate_the_cache(self):
+        self.make_posts(1)
+        post = Post.objects.get(author_page=self.uni)
+        self.assertInvalidates(lambda: Post.objects.create(author_page=self.uni, content_text="new"))
+        self.assertInvalidates(lambda: Post.objects.get(pk=post.pk).save())
+        self.assertInvalidates(lambda: Post.objects.get(pk=post.pk).delete())
+
+    def test_engagement_invalidates_the_cache(self):
+        self.make_posts(1)
+        post = Post.objects.get(author_page=self.uni)
+        self.assertInvalidates(lambda: PostReaction.objects.create(post=post, user=self.author))
+        self.assertInvalidates(lambda: PostReaction.objects.get(post=post).delete())
+        self.assertInvalidates(lambda: Comment.objects.create(post=post, author_user=self.author, content="c"))
+        self.assertInvalidates(lambda: Comment.objects.get(post=post).delete())
+
+    def test_feed_sources_invalidate_the_cache(self):
+        self.make_posts(1)
+        community = Community.objects.create(name="Chess")
+        page = Page.objects.create(page_name="Library", page_type=Page.PageType.UNIVERSITY)
+        self.assertInvalidates(lambda: CommunityMember.objects.create(community=community, user=self.user))
+        self.assertInvalidates(lambda: CommunityMember.objects.get(user=self.user).delete())
+        self.assertInvalidates(lambda: FollowPage.objects.create(page=page, user=self.user))
+        self.assertInvalidates(lambda: FollowPage.objects.get(user=self.user).delete())
+
+    def test_cursor_round_trip(self):
+        created_at, as_of = timezone.now() - timedelta(hours=1), timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(70, created_at, 12, as_of)), (70, created_at, 12, as_of))
+
+    def test_pages_break_ties_by_post_id(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(author_page=self.uni, content_text=str(i)) for i in range(5)]
+        # same affinity, no engagement, same time: only the post id orders them
+        same_time = timezone.now()
+        Post.objects.update(created_at=same_time)
+        FeedEntry.objects.update(created_at=same_time)
+
+        seen, cursor = [], None
+        while True:
+            data = self.client.get("/api/posts/feed/", {"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+            seen += [item["id"] for item in data["results"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted((p.pk for p in posts), reverse=True))
+
+    def test_invalid_cursor(self):
+        self.make_posts(1)
+        garbage = base64.urlsafe_b64encode(b'["x",1]').decode()
+        for cursor in ("zzz", garbage):
+            response = self.client.get("/api/posts/feed/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"message": "invalid cursor"})
+
+    def test_rebuild_keeps_own_posts(self):
+        own = Post.objects.create(author_user=self.user, content_text="mine")
+        # older than the global window, so only the author source finds it
+        Post.objects.filter(pk=own.pk).update(created_at=timezone.now() - timedelta(days=5))
+        FeedEntry.objects.all().delete()
+        rebuild_user_feed(self.user)
+        self.assertEqual([p["id"] for p in self.get_feed(10)["results"]], [own.pk])
+
+    def test_empty_feed(self):
+        # no posts at all: the rebuild has nothing to rank
+        response = self.client.get("/api/posts/feed/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"results": [], "next_cursor": None})
+
+    def test_ranked_on_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = Post.objects.create(author_page=self.uni, content_text="old")
+            new = Post.objects.create(author_page=self.uni, content_text="new")
+        rebuild_user_feed(self.user)
+        # the post ages after it was fanned out: it drops a freshness step
+        earlier = timezone.now() - timedelta(hours=7)
+        Post.objects.filter(pk=old.pk).update(created_at=earlier)
+        FeedEntry.objects.filter(post=old).update(created_at=earlier)
+        self.assertEqual([p["id"] for p in self.get_feed(10)["results"]], [new.pk, old.pk])
+
+        # engagement counts as it is now, not as it was when the entry was written
+        Post.objects.filter(pk=old.pk).update(reactions_count=50)
+        self.assertEqual([p["id"] for p in self.get_feed(10)["results"]], [old.pk, new.pk])
+
+    @override_settings(FEED_MAX_ENTRIES=3)
+    def test_fan_out_trims_full_feeds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(author_page=self.uni, content_text=str(i)) for i in range(5)]
+        # same affinity and freshness: the newest ones stay
+        kept = FeedEntry.objects.filter(user=self.user).values_list("post_id", flat=True)
+        self.assertEqual(sorted(kept), [p.pk for p in posts[2:]])
+
+    def test_first_visit_rebuilds_a_fanned_out_feed(self):
+        author_post = Post.objects.create(author_user=self.author, content_text="global")
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author_page=self.uni, content_text="fanned out")
+        self.assertEqual(FeedEntry.objects.filter(user=self.user).count(), 1)
+
+        # bob's post only comes in through the rebuild
+        results = self.client.get("/api/posts/feed/").json()["results"]
+        self.assertIn(author_post.pk, [p["id"] for p in results])
+        self.assertIsNotNone(UserProfile.objects.get(user=self.user).feed_rebuilt_at)
+
+    def test_source_changes_rebuild_the_feed(self):
+        community = Community.objects.create(name="Chess")
+        post = Post.objects.create(author_user=self.author, community=community, content_text="c")
+        # older than the global window, so only the community source finds it
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - timedelta(days=5))
+        rebuild_user_feed(self.user)
+
+        def feed_ids():
+            cache.clear()
+            return [p["id"] for p in self.client.get("/api/posts/feed/").json()["results"]]
+
+        self.assertEqual(feed_ids(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            member = CommunityMember.objects.create(community=community, user=self.user)
+        self.assertEqual(feed_ids(), [post.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.delete()
+        call_command("rebuild_feed", "--changed-since", "5", stdout=StringIO())
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+
+class RankingTests(TestCase):
+    """The NumPy ranking (api/feed/ranking.py) against its SQL reference, scoring.annotate_scores."""
+
+    def setUp(self):
+        self.uni = Page.objects.create(page_name="PTUK", page_type=Page.PageType.UNIVERSITY)
+        self.followed = Page.objects.create(page_name="Library", page_type=Page.PageType.UNIVERSITY)
+        other = Page.objects.create(page_name="Other", page_type=Page.PageType.UNIVERSITY)
+        community = Community.objects.create(name="Chess")
+        self.sources = FeedSources(self.uni.page_id, [community.community_id], [self.followed.page_id], None)
+        self.weights = get_weights()
+        self.as_of = timezone.now()
+
+        # every freshness step boundary, and a microsecond either side of it
+        ages = [timedelta(0)]
+        for max_age, _ in self.weights.freshness:
+            ages += [max_age - timedelta(microseconds=1), max_age, max_age + timedelta(microseconds=1)]
+        author = User.objects.create_user(username="bob")
+        posts = []
+        for i, age in enumerate(ages * 3):
+            page = (self.uni, self.followed, other, None)[i % 4]
+            posts.append(
+                Post(
+                    author_page=page,
+                    author_user=None if page else author,
+                    community=community if i % 3 == 0 else None,
+                    reactions_count=(0, 3, 40)[i % 3],
+                    comments_count=i % 5,
+                )
+            )
+        # ten equal posts (same source, engagement and time): only the post id orders them
+        posts += [Post(author_page=self.uni) for _ in range(10)]
+        Post.objects.bulk_create(posts)
+        for post, age in zip(posts, ages * 3 + [timedelta(hours=1)] * 10):
+            post.created_at = self.as_of - age
+        Post.objects.bulk_update(posts, ["created_at"])
+        self.tied = [post.post_id for post in posts[-10:]]
+        self.qs = Post.objects.all()
+
+    def sql_order(self, k):
+        ranked = annotate_scores(self.qs, self.sources, self.weights, self.as_of)
+        rows = ranked.order_by("-score", "-created_at", "-post_id").values_list("post_id", "score")
+        return list(rows[:k])
+
+    def numpy_order(self, k):
+        return [(r.post_id, r.score) for r in rank(self.qs, self.sources, self.weights, k, now=self.as_of)]
+
+    def test_same_order_as_sql(self):
+        total = self.qs.count()
+        for k in (1, 5, 17, total, total + 5):
+            with self.subTest(k=k):
+                self.assertEqual(self.numpy_order(k), self.sql_order(k))
+
+    def test_ties_at_the_kth_score(self):
+        order = [post_id for post_id, _ in self.sql_order(self.qs.count())]
+        # k cuts through the ten tied posts
+        k = order.index(max(self.tied)) + 4
+        self.assertEqual(self.numpy_order(k), self.sql_order(k))
+        self.assertEqual([post_id for post_id, _ in self.numpy_order(k)][-4:], sorted(self.tied, reverse=True)[:4])
+
+
+@async_api_view(["GET"])
+@throttle_classes([LoginIPThrottle])
+@permission_classes([IsAuthenticated])
+async def whoami(request):
+    return Response({"username": request.user.username})
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alice", password="pw")
+        UserProfile.objects.create(user=self.user)
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def test_read_endpoints_are_async(self):
+        self.assertTrue(iscoroutinefunction(feed))
+        self.assertTrue(iscoroutinefunction(me))
+
+    async def test_served_over_asgi(self):
+        response = await self.async_client.get("/api/auth/me/", headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "alice")
+
+        response = await self.async_client.get("/api/posts/feed/", headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"results": [], "next_cursor": None})
+
+    async def test_drf_authentication_and_errors(self):
+        response = await self.async_client.get("/api/auth/me/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+        response = await self.async_client.get("/api/auth/me/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    @override_settings(THROTTLES={"login_ip": {"CAPACITY": 1, "REFILL_PER_MINUTE": 1}})
+    async def test_drf_throttles(self):
+        factory = AsyncRequestFactory()
+        response = await whoami(factory.get("/", headers=self.auth))
+        self.assertEqual((response.status_code, response.data), (200, {"username": "alice"}))
+        response = await whoami(factory.get("/", headers=self.auth))
+        self.assertEqual(response.status_code, 429)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.profile = UserProfile.objects.create(user=self.user, profile_image="profiles/a.png")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_cached_user_needs_no_query(self):
+        self.client.get("/api/auth/me/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/me/")
+        self.assertEqual(response.json()["avatar"], "http://testserver/media/profiles/a.png")
+
+    def test_saves_invalidate_the_cached_user(self):
+        self.client.get("/api/auth/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_image = "profiles/b.png"
+            self.profile.save()
+        self.assertEqual(self.client.get("/api/auth/me/").json()["avatar"], "http://testserver/media/profiles/b.png")
+
+        # a new username does not touch the profile row, the ETag still moves
+        etag = self.client.get("/api/auth/me/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = "alicia"
+            self.user.save()
+        response = self.client.get("/api/auth/me/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "alicia")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+
+class BlacklistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.client = APIClient()
+        blacklist.rebuild()
+
+    def test_logged_out_token_cannot_refresh(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post("/api/auth/logout/", {"refresh": refresh}).status_code, 200)
+        self.assertEqual(self.client.post("/api/auth/refresh/", {"refresh": refresh}).status_code, 401)
+
+    def test_unknown_jti_is_not_looked_up(self):
+        token = RefreshToken.for_user(self.user)
+        # the blacklist generation did not move, so there is nothing to sync
+        with self.assertNumQueries(0):
+            self.assertFalse(blacklist.contains(token["jti"]))
+
+    def test_blacklisted_by_another_worker(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(blacklist.contains(token["jti"]))
+        # no on_commit callbacks run: this process's filter only learns about it by syncing
+        token.blacklist()
+        self.assertFalse(blacklist.contains(token["jti"]))
+        # what the other worker's commit does to the shared cache
+        bump_generation()
+        # the sync reads the new row, which answers the check too
+        with self.assertNumQueries(1):
+            self.assertTrue(blacklist.contains(token["jti"]))
+
+    @override_settings(BLACKLIST_SYNC_SECONDS=0)
+    def test_synced_after_the_staleness_window(self):
+        blacklist.rebuild()
+        token = RefreshToken.for_user(self.user)
+        # blacklisted where the cache is not shared: no generation bump reaches this worker
+        token.blacklist()
+        self.assertTrue(blacklist.contains(token["jti"]))
+
+    def test_purge_tokens(self):
+        expired, live = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=timezone.now() - timedelta(days=1))
+        call_command("purge_tokens", stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_rotated_token_is_blacklisted(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()["refresh"], refresh)
+        self.assertEqual(self.client.post("/api/auth/refresh/", {"refresh": refresh}).status_code, 401)
+
+
+class HashingPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.client = APIClient()
+        self.saved, hashing.pool = hashing.pool, hashing.HashingPool(workers=1, max_queue=0)
+        self.addCleanup(setattr, hashing, "pool", self.saved)
+
+    def login(self):
+        return self.client.post("/api/auth/login/", {"username": "alice", "password": "pw"}, format="json")
+
+    def test_login_hashes_on_the_pool(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual((hashing.pool.queued, hashing.pool.running), (0, 0))
+
+    def test_full_pool_answers_429(self):
+        release = threading.Event()
+        busy = hashing.pool.submit(release.wait)
+        try:
+            response = self.login()
+        finally:
+            release.set()
+            busy.result()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.login().status_code, 200)
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    @override_settings(THROTTLES={"login_username": {"CAPACITY": 2, "REFILL_PER_MINUTE": 60}})
+    def test_login_bucket_per_username(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post("/api/auth/login/", {"username": "bob"}).status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/auth/login/", {"username": "bob"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        # other usernames have their own bucket
+        self.assertEqual(self.client.post("/api/auth/login/", {"username": "carol"}).status_code, 400)
+
+    def test_send_code_per_email(self):
+        body = {"username": "dave", "academicEmail": "dave@students.ptuk.edu.ps"}
+        # a mistyped request does not lock the email out of the next one
+        self.assertEqual(self.client.post("/api/auth/send_code/", {**body, "username": "Dave"}).status_code, 400)
+        self.assertEqual(self.client.post("/api/auth/send_code/", body).status_code, 200)
+        self.assertEqual(self.client.post("/api/auth/send_code/", body).status_code, 200)
+        self.assertEqual(self.client.post("/api/auth/send_code/", body).status_code, 429)
+
+    def test_key_is_safe_for_any_cache(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            response = self.client.post("/api/auth/login/", {"username": "bob\n" + "x" * 300})
+        self.assertEqual(response.status_code, 400)
+
+
+class SendCodeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_username_taken_in_any_case(self):
+        User.objects.create_user(username="Dave", password="pw")
+        body = {"username": "dave", "academicEmail": "dave@students.ptuk.edu.ps"}
+        response = self.client.post("/api/auth/send_code/", body)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "Username already taken")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server for smtplib: keeps the messages, refuses recipients named bounce*."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.messages = []
+        self.connections = 0
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in")
+        while line := self.rfile.readline().decode():
+            verb = line[:4].upper()
+            if verb == "RCPT" and "<bounce" in line:
+                self.reply("550 no such user")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                data = []
+                while (line := self.rfile.readline()) not in (b".\r\n", b""):
+                    data.append(line.decode())
+                self.server.messages.append("".join(data))
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                break
+            else:
+                self.reply("250 ok")
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        overrides = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            DEFAULT_FROM_EMAIL="noreply@ptuk.edu.ps",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_send_code_only_enqueues(self):
+        body = {"username": "erin", "academicEmail": "erin@students.ptuk.edu.ps"}
+        self.assertEqual(self.client.post("/api/auth/send_code/", body).status_code, 200)
+        self.assertEqual(self.smtp.connections, 0)
+        # nor does it start background jobs, the server entrypoints do (backend/wsgi.py, backend/asgi.py)
+        self.assertIsNone(purge_scheduler.thread)
+
+        mail = OutboxEmail.objects.get()
+        self.assertEqual((mail.to, mail.status), ("erin@students.ptuk.edu.ps", OutboxEmail.Status.PENDING))
+        code = EmailVerification.objects.get().code
+        self.assertEqual(Worker().run_once(), (1, 0))
+        self.assertIn(f"Your verification code is: {code}", self.smtp.messages[0])
+
+    def test_batch_over_one_connection_with_retry(self):
+        for to in ["a@students.ptuk.edu.ps", "bounce@students.ptuk.edu.ps", "b@students.ptuk.edu.ps"]:
+            OutboxEmail.objects.create(to=to, subject="hello", body="hi")
+        worker = Worker()
+        self.assertEqual(worker.run_once(), (2, 1))
+        self.assertEqual(worker.run_once(), (0, 0))
+        self.assertEqual((self.smtp.connections, len(self.smtp.messages)), (1, 2))
+
+        sent = OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT)
+        self.assertEqual(sent.count(), 2)
+        self.assertFalse(sent.filter(delivery_ms__isnull=True).exists())
+        bounced = OutboxEmail.objects.get(to="bounce@students.ptuk.edu.ps")
+        self.assertEqual((bounced.status, bounced.attempts), (OutboxEmail.Status.PENDING, 1))
+        self.assertGreater(bounced.next_attempt_at, bounced.created_at)
+        self.assertIn("no such user", bounced.last_error)
+
+    def test_broken_message_fails_without_stopping_the_worker(self):
+        OutboxEmail.objects.create(to="a\nb@students.ptuk.edu.ps", subject="hello", body="hi")
+        OutboxEmail.objects.create(to="c@students.ptuk.edu.ps", subject="hello", body="hi")
+        self.assertEqual(Worker().run_once(), (1, 1))
+        broken = OutboxEmail.objects.get(status=OutboxEmail.Status.FAILED)
+        self.assertEqual((broken.attempts, "newlines" in broken.last_error), (1, True))
+
+    def test_send_code_rejects_a_bad_address(self):
+        body = {"username": "erin", "academicEmail": "a\nb@students.ptuk.edu.ps"}
+        self.assertEqual(self.client.post("/api/auth/send_code/", body).status_code, 400)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
+class VerificationPurgeTests(TestCase):
+    def test_purges_expired_codes_in_chunks(self):
+        for i in range(5):
+            v = EmailVerification(username=f"u{i}", academic_email=f"u{i}@students.ptuk.edu.ps", code="000000")
+            v.set_expiry(minutes=-1 if i < 3 else 10)
+            v.save()
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            self.assertEqual(purge_expired_verifications(batch_size=2), 3)
+        self.assertEqual(sum(q["sql"].startswith("DELETE") for q in ctx.captured_queries), 2)
+        self.assertEqual(sorted(EmailVerification.objects.values_list("username", flat=True)), ["u3", "u4"])
+
+
+class ReactionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.post = Post.objects.create(author_user=self.user, content_text="hi")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_double_tap_reacts_once(self):
+        url = f"/api/posts/{self.post.post_id}/react/"
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(url).json()
+            second = self.client.post(url).json()
+
+        self.assertEqual(first, {"reacted": True, "changed": True, "reactions_count": 1})
+        self.assertEqual(second, {"reacted": True, "changed": False, "reactions_count": 1})
+        self.assertEqual(PostReaction.objects.filter(post=self.post).count(), 1)
+
+    def test_unreact(self):
+        url = f"/api/posts/{self.post.post_id}/react/"
+        self.client.post(url)
+        first = self.client.delete(url).json()
+        second = self.client.delete(url).json()
+
+        self.assertEqual(first, {"reacted": False, "changed": True, "reactions_count": 0})
+        self.assertEqual(second, {"reacted": False, "changed": False, "reactions_count": 0})
+        self.assertFalse(PostReaction.objects.exists())
+
+    def test_comment_reaction(self):
+        comment = Comment.objects.create(post=self.post, author_user=self.user, content="c")
+        response = self.client.post(f"/api/comments/{comment.comment_id}/react/")
+
+        self.assertEqual(response.json()["reactions_count"], 1)
+        self.assertEqual(CommentReaction.objects.get().comment_id, comment.comment_id)
+        comment.refresh_from_db()
+        self.assertEqual(comment.reactions_count, 1)
+
+    def test_missing_post(self):
+        response = self.client.post("/api/posts/999999/react/")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(PostReaction.objects.exists())
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.post = Post.objects.create(author_user=self.user, content_text="hi")
+
+    def counts(self):
+        return Post.objects.values_list("reactions_count", "comments_count").get(pk=self.post.pk)
+
+    def test_signals_bump(self):
+        reaction = PostReaction.objects.create(post=self.post, user=self.user)
+        comment = Comment.objects.create(post=self.post, author_user=self.user, content="c")
+        Comment.objects.create(post=self.post, parent_comment=comment, author_user=self.user, content="r")
+        self.assertEqual(self.counts(), (1, 2))
+        self.assertEqual(Comment.objects.get(pk=comment.pk).replies_count, 1)
+
+        reaction.delete()
+        comment.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_bump_stops_at_zero(self):
+        bump(Post, self.post.pk, "reactions_count", -3)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_save_keeps_counters(self):
+        PostReaction.objects.create(post=self.post, user=self.user)
+        # self.post still says 0 reactions
+        self.post.content_text = "edited"
+        self.post.save()
+        self.assertEqual(self.counts(), (1, 0))
+        self.assertEqual(Post.objects.get(pk=self.post.pk).content_text, "edited")
+
+    def test_reconcile(self):
+        PostReaction.objects.create(post=self.post, user=self.user)
+        Post.objects.filter(pk=self.post.pk).update(reactions_count=7, comments_count=2)
+
+        out = StringIO()
+        call_command("reconcile_counters", "--dry-run", stdout=out)
+        self.assertIn("post.reactions_count: 1 drifted rows", out.getvalue())
+        self.assertIn("found 2 drifted counters", out.getvalue())
+        self.assertEqual(self.counts(), (7, 2))
+
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0))
+
+
+class ReactionBufferTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pw")
+        self.bob = User.objects.create_user(username="bob", password="pw")
+        self.post = Post.objects.create(author_user=self.alice, content_text="hi")
+        self.journal = tempfile.TemporaryDirectory()
+        self.addCleanup(self.journal.cleanup)
+
+    def make_buffer(self):
+        # the background thread never gets to flush, the tests do it themselves
+        return ReactionBuffer(flush_interval_ms=3_600_000, max_events=10_000, journal_dir=self.journal.name)
+
+    def test_events_are_coalesced(self):
+        buffer = self.make_buffer()
+        for reacted in (True, False, True, True):
+            buffer.add(reactions.POST, self.post.post_id, self.alice.id, reacted=reacted)
+        buffer.add(reactions.POST, self.post.post_id, self.bob.id)
+        buffer.add(reactions.POST, self.post.post_id, self.bob.id, reacted=False)
+        buffer.flush()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reactions_count, 1)
+        self.assertEqual(list(PostReaction.objects.values_list("user_id", flat=True)), [self.alice.id])
+        self.assertEqual(os.listdir(self.journal.name), [f"reactions-{os.getpid()}-1.jsonl"])
+
+    def test_journal_is_replayed_after_a_crash(self):
+        crashed = self.make_buffer()
+        crashed.add(reactions.POST, self.post.post_id, self.alice.id)
+        crashed.add(reactions.POST, self.post.post_id, self.bob.id)
+        # the crash: the journal is all that is left
+        crashed.journal.close()
+        crashed.pending.clear()
+
+        # a new process, with the same pid as the crashed one
+        restarted = self.make_buffer()
+        restarted.start()
+        restarted.flush()
+        # replaying twice must not count twice
+        PostReaction.objects.filter(user=self.bob).delete()
+        with open(os.path.join(self.journal.name, "reactions-999999999-0.jsonl"), "w") as f:
+            f.write(f'["post", {self.post.post_id}, {self.alice.id}, true]\n["post", {self.post.post_id}, ')
+        replayed = self.make_buffer()
+        replayed.start()
+        replayed.flush()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reactions_count, 1)
+        self.assertEqual(PostReaction.objects.count(), 1)
+
+    def test_segments_are_replayed_in_numeric_order(self):
+        dead = 999999999
+        for n, reacted in ((2, "true"), (10, "false")):
+            with open(os.path.join(self.journal.name, f"reactions-{dead}-{n}.jsonl"), "w") as f:
+                f.write(f'["post", {self.post.post_id}, {self.alice.id}, {reacted}]\n')
+        buffer = self.make_buffer()
+        buffer.start()
+        buffer.flush()
+        self.assertFalse(PostReaction.objects.exists())
+
+    def test_unreact_counts_down_once(self):
+        for user in (self.alice, self.bob):
+            PostReaction.objects.create(post=self.post, user=user)
+        buffer = self.make_buffer()
+        buffer.add(reactions.POST, self.post.post_id, self.alice.id, reacted=False)
+        buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reactions_count, 1)
+
+    def test_removals_bump_once_per_post(self):
+        for user in (self.alice, self.bob):
+            PostReaction.objects.create(post=self.post, user=user)
+        buffer = self.make_buffer()
+        for user in (self.alice, self.bob):
+            buffer.add(reactions.POST, self.post.post_id, user.id, reacted=False)
+        with CaptureQueriesContext(connections["default"]) as queries, self.captureOnCommitCallbacks() as callbacks:
+            buffer.flush()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reactions_count, 0)
+        self.assertFalse(PostReaction.objects.exists())
+        # one DELETE for both reactions, one counter UPDATE, one feed invalidation
+        sql = [q["sql"] for q in queries.captured_queries]
+        self.assertEqual(sum(q.startswith("DELETE") for q in sql), 1)
+        self.assertEqual(sum(q.startswith('UPDATE "post"') for q in sql), 1)
+        self.assertEqual(len(callbacks), 1)
+
+
+class ImportCampusTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_campus", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_pages_in_batches(self):
+        Page.objects.create(page_name="Library")
+        path = self.write(
+            "pages.csv",
+            "page_name,page_type,verified\n"
+            "PTUK,university,yes\n"
+            "Library,other,\n"
+            "Chess,student_club,\n"
+            ",other,\n"
+            "Robotics,lab,1\n",
+        )
+        out, err = self.run_import("pages", path, "--batch-size", "2")
+
+        self.assertEqual(
+            sorted(Page.objects.values_list("page_name", "verified")),
+            [("Chess", False), ("Library", False), ("PTUK", True), ("Robotics", True)],
+        )
+        # one line per committed batch
+        self.assertEqual([line.split(",")[0] for line in out.splitlines()[:3]], ["  2 rows", "  4 rows", "  5 rows"])
+        self.assertIn("imported 3 pages from 5 rows", out)
+        self.assertIn("row 4: page_name is required", err)
+        self.assertFalse(os.path.exists(f"{path}.progress"))
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_users(self):
+        page = Page.objects.create(page_name="PTUK", page_type=Page.PageType.UNIVERSITY)
+        UniversityDomain.objects.create(page=page, domain="students.ptuk.edu.ps")
+        User.objects.create_user(username="bob")
+        path = self.write(
+            "users.jsonl",
+            '{"username": "alice", "academic_email": "alice@students.ptuk.edu.ps", "password": "pw"}\n'
+            '{"username": "bob", "academic_email": "bob@students.ptuk.edu.ps"}\n'
+            '{"username": "carol", "academic_email": "carol@gmail.com"}\n',
+        )
+        out, err = self.run_import("users", path, "--workers", "1")
+
+        alice = User.objects.get(username="alice")
+        self.assertTrue(alice.check_password("pw"))
+        self.assertEqual(alice.student_profile.university_page, page)
+        self.assertEqual(alice.profile.academic_email, "alice@students.ptuk.edu.ps")
+        self.assertFalse(User.objects.filter(username="carol").exists())
+        self.assertIn("imported 1 users from 3 rows", out)
+        self.assertIn("unsupported academic email domain 'gmail.com'", err)
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_users_are_hashed_before_the_transaction(self):
+        page = Page.objects.create(page_name="PTUK", page_type=Page.PageType.UNIVERSITY)
+        UniversityDomain.objects.create(page=page, domain="students.ptuk.edu.ps")
+        command = ImportCampusCommand()
+        command.prepare({"kind": "users", "workers": 1})
+        write = command.import_users([{"username": "alice", "academic_email": "alice@students.ptuk.edu.ps"}], 1)
+        # the hashes are in: the pool is not needed any more, and nothing has been written yet
+        command.pool.shutdown()
+        self.assertFalse(User.objects.filter(username="alice").exists())
+
+        User.objects.create_user(username="alice")
+        # signed up while the batch was hashed
+        self.assertEqual(write(), (0, 1))
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write("pages.jsonl", "".join(f'{{"page_name": "page {i}"}}\n' for i in range(5)))
+        # a run that stopped after committing the first 3 rows (which were then removed by hand)
+        self.write("pages.jsonl.progress", '{"rows": 3}')
+        out, _ = self.run_import("pages", path)
+
+        self.assertIn("resuming after row 3", out)
+        self.assertEqual(sorted(Page.objects.values_list("page_name", flat=True)), ["page 3", "page 4"])
+        self.assertFalse(os.path.exists(f"{path}.progress"))
+
+        # --restart ignores the checkpoint; the rows imported already are skipped
+        self.write("pages.jsonl.progress", '{"rows": 3}')
+        out, _ = self.run_import("pages", path, "--restart")
+        self.assertIn("imported 3 pages from 5 rows", out)
+        self.assertEqual(Page.objects.count(), 5)
+
+
+class MetricsTests(TestCase):
+    def test_render(self):
+        registry = Registry()
+        registry.observe_request("posts_feed", "GET", 200, 0.02, 3, 0.001)
+        registry.inc("campus_things_total", "Things.", 2, kind="a")
+        registry.gauge("campus_queue_depth", "Queue depth.", lambda: 4)
+        lines = registry.render().splitlines()
+
+        for line in [
+            'campus_http_requests_total{view="posts_feed",method="GET",status="200"} 1',
+            'campus_http_request_duration_seconds_bucket{view="posts_feed",le="0.01"} 0',
+            'campus_http_request_duration_seconds_bucket{view="posts_feed",le="0.025"} 1',
+            'campus_http_request_duration_seconds_bucket{view="posts_feed",le="+Inf"} 1',
+            'campus_http_request_duration_seconds_count{view="posts_feed"} 1',
+            # buckets are upper bounds, inclusive
+            'campus_db_queries_per_request_bucket{view="posts_feed",le="2"} 0',
+            'campus_db_queries_per_request_bucket{view="posts_feed",le="3"} 1',
+            'campus_db_query_duration_seconds_total{view="posts_feed"} 0.001000',
+            "# TYPE campus_things_total counter",
+            'campus_things_total{kind="a"} 2',
+            "# TYPE campus_queue_depth gauge",
+            "campus_queue_depth 4",
+        ]:
+            self.assertIn(line, lines)
+
+    def test_endpoint_is_admin_only(self):
+        client = APIClient()
+        self.assertEqual(client.get("/api/metrics/").status_code, 401)
+
+        client.force_authenticate(User.objects.create_user(username="alice", password="pw"))
+        self.assertEqual(client.get("/api/metrics/").status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username="root", password="pw", is_staff=True))
+        response = client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE campus_http_requests_total counter", response.content.decode())
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def compress(self, response, accept="gzip"):
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_json(self):
+        body = b'{"results": []}' * 100
+        response = self.compress(HttpResponse(body, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    def test_skips(self):
+        big, small = b"x" * 1000, b"x" * 100
+        self.assertFalse(self.compress(HttpResponse(small, content_type="application/json")).has_header("Vary"))
+        self.assertFalse(self.compress(HttpResponse(big, content_type="image/png")).has_header("Content-Encoding"))
+        refused = self.compress(HttpResponse(big, content_type="text/plain"), accept="gzip;q=0, br;q=0")
+        self.assertFalse(refused.has_header("Content-Encoding"))
+
+    def test_weak_etag(self):
+        response = HttpResponse(b"x" * 1000, content_type="application/json")
+        response["ETag"] = '"abc"'
+        self.assertEqual(self.compress(response)["ETag"], 'W/"abc"')
+
+    def test_streaming(self):
+        chunks = [b"x" * 1000, b"y" * 1000]
+        response = self.compress(StreamingHttpResponse(iter(chunks), content_type="text/plain"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(chunks))
+
+    def test_tokens_are_not_compressed(self):
+        cache.clear()
+        User.objects.create_user(username="alice", password="pw")
+        response = self.client.post(
+            "/api/auth/login/", {"username": "alice", "password": "pw"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(len(response.content), settings.COMPRESSION["MIN_SIZE"])
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class RendererTests(TestCase):
+    # aware with and without microseconds, naive: orjson and the stdlib must both print them as isoformat() does
+    moments = [
+        datetime(2026, 10, 18, 9, 30, 5, 123456, tzinfo=dt_timezone.utc),
+        datetime(2026, 10, 18, 9, 30, tzinfo=ZoneInfo("Asia/Hebron")),
+        datetime(2026, 10, 18, 9, 30, 5, 7),
+    ]
+
+    def payload(self):
+        return {
+            "results": [{"id": 1, "created_at": m, "day": m.date(), "at": m.timetz()} for m in self.moments],
+            "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+            "text": 'مرحبا "quoted" / \u2028',
+            "nested": {"float": 1.5, "none": None, "bool": True, 7: "int key"},
+        }
+
+    def test_datetimes_as_isoformat(self):
+        # a fixed offset, as parse_datetime() returns them: orjson 3.8 does not take it
+        moments = [*self.moments, datetime(2026, 10, 18, 9, 30, tzinfo=dt_timezone(timedelta(hours=3)))]
+        rendered = json.loads(FastJSONRenderer().render({"moments": moments, "day": moments[0].date()}))
+        self.assertEqual(rendered["moments"], [m.isoformat() for m in moments])
+        self.assertEqual(rendered["day"], "2026-10-18")
+
+    def test_stdlib_fallback_writes_the_same_bytes(self):
+        self.assertEqual(stdlib_dumps(self.payload()), FastJSONRenderer().render(self.payload()))
+
+    def test_malformed_json_is_a_drf_400(self):
+        cache.clear()
+        response = APIClient().post("/api/auth/login/", '{"username": "alice",', content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error - "))
+
+    def test_parses_what_it_renders(self):
+        body = FastJSONRenderer().render(self.payload())
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), json.loads(body))
+
+
+def add_file_database(alias, directory, **options):
+    """Adds a database alias backed by a SQLite file in `directory`, a copy of the test database."""
+    path = os.path.join(directory, f"{alias}.sqlite3")
+    primary = connections["default"]
+    primary.ensure_connection()
+    with sqlite3.connect(path) as copy:
+        primary.connection.backup(copy)
+    connections.settings[alias] = dict(connections.settings["default"], NAME=path, **options)
+    return path
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+class WriteQueueTests(TransactionTestCase):
+    """api/sqlite/base.py: the in-memory test database skips the queue, so these run on a file."""
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = add_file_database("queued", cls.tmp.name, SERIALIZE_WRITES=True)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database("queued")
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.lock = write_lock(self.path)
+
+    def test_transactions_are_serialized(self):
+        log, entered, release = [], threading.Event(), threading.Event()
+
+        def first():
+            with transaction.atomic(using="queued"):
+                Page.objects.using("queued").create(page_name="first")
+                log.append("first in")
+                entered.set()
+                release.wait(5)
+                log.append("first out")
+            connections["queued"].close()
+
+        def second():
+            with transaction.atomic(using="queued"):
+                log.append("second in")
+                Page.objects.using("queued").create(page_name="second")
+            connections["queued"].close()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        threads[0].start()
+        entered.wait(5)
+        threads[1].start()
+        # the second transaction waits in the queue, not in SQLite's busy handler
+        threads[1].join(0.3)
+        self.assertTrue(threads[1].is_alive())
+        self.assertEqual(log, ["first in"])
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(log, ["first in", "first out", "second in"])
+        self.assertEqual(Page.objects.using("queued").count(), 2)
+        self.assertFalse(self.lock.locked())
+
+    def test_waits_in_the_queue(self):
+        errors = []
+
+        def impatient():
+            connection = connections["queued"]
+            connection.settings_dict = {**connection.settings_dict, "OPTIONS": {"timeout": 0.2}}
+            try:
+                with transaction.atomic(using="queued"):
+                    pass
+            except OperationalError as e:
+                errors.append(str(e))
+            connection.close()
+
+        with transaction.atomic(using="queued"):
+            thread = threading.Thread(target=impatient)
+            thread.start()
+            thread.join(5)
+        # the queue gave up, SQLite's busy handler was never reached
+        self.assertEqual(errors, ["database is locked (timed out in the write queue)"])
+
+    def test_released_on_commit(self):
+        with transaction.atomic(using="queued"):
+            self.assertTrue(self.lock.locked())
+            Page.objects.using("queued").create(page_name="kept")
+        self.assertFalse(self.lock.locked())
+
+    def test_released_on_rollback(self):
+        with self.assertRaises(ValueError), transaction.atomic(using="queued"):
+            Page.objects.using("queued").create(page_name="dropped")
+            raise ValueError
+        self.assertFalse(self.lock.locked())
+        self.assertFalse(Page.objects.using("queued").exists())
+
+    def test_released_on_close(self):
+        with transaction.atomic(using="queued"):
+            self.assertTrue(self.lock.locked())
+            # e.g. CONN_HEALTH_CHECKS dropping a broken connection mid-transaction
+            connections["queued"].close()
+            self.assertFalse(self.lock.locked())
+        self.assertFalse(Page.objects.using("queued").exists())
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    # not TestCase: its per-test transaction would keep every read on the primary
+    # "__all__" is resolved in setUpClass, after the replica alias exists
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        # the replica is a second SQLite file, a copy of the test database's schema
+        cls.tmp = tempfile.TemporaryDirectory()
+        add_file_database("replica", cls.tmp.name, SERIALIZE_WRITES=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database("replica")
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pw")
+        UserProfile.objects.create(user=self.user)
+        # the replica's copy differs, so every read shows where it went
+        User.objects.using("replica").create(id=self.user.id, username="alice", password="pw")
+        UserProfile.objects.using("replica").create(user_id=self.user.id, profile_image="profiles/replica.png")
+
+    def tearDown(self):
+        User.objects.using("replica").all().delete()
+
+    def profile_image(self):
+        return UserProfile.objects.get(user_id=self.user.id).profile_image.name or None
+
+    def test_reads_stay_on_primary_by_default(self):
+        self.assertIsNone(self.profile_image())
+
+    def test_read_only_view_uses_replica(self):
+        # a real token, so authentication itself loads the user inside the view
+        token = AccessToken.for_user(self.user)
+        response = APIClient().get("/api/auth/me/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.json()["avatar"], "http://testserver/media/profiles/replica.png")
+
+    def test_reads_after_a_write_go_to_primary(self):
+        with read_from_replica():
+            self.assertEqual(self.profile_image(), "profiles/replica.png")
+            UserProfile.objects.filter(user_id=self.user.id).update(bio="hi")
+            self.assertIsNone(self.profile_image())
+
+    def test_reads_in_a_transaction_go_to_primary(self):
+        with read_from_replica(), transaction.atomic():
+            self.assertIsNone(self.profile_image())
+
+    def test_instances_read_on_the_replica_are_saved_to_the_primary(self):
+        with read_from_replica():
+            profile = UserProfile.objects.select_related(None).get(user_id=self.user.id)
+        self.assertEqual(profile._state.db, "replica")
+        # lazy loads outside the block do not follow the instance back to the replica either
+        self.assertEqual(profile.user._state.db, "default")
+
+        profile.bio = "saved"
+        profile.save()
+        self.assertEqual(UserProfile.objects.using("default").get(user_id=self.user.id).bio, "saved")
+        self.assertIsNone(UserProfile.objects.using("replica").get(user_id=self.user.id).bio)
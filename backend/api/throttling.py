@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Token buckets in Django's cache, one per (scope, key): a bucket holds up to CAPACITY requests and
+# refills REFILL_PER_MINUTE of them a minute, so a client can burst CAPACITY requests and then keeps
+# going at the refill rate. DRF runs throttles before the view, so a rejected request costs no query
+# and no password hash. Scopes and their sizes are in settings.THROTTLES; a scope missing from it is
+# not throttled.
+#
+# Taking a token is a get and a set, atomic within this process. With a cache shared between processes
+# two requests can race for the last token; both then get through, which is fine for abuse protection.
+
+_lock = threading.Lock()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_key(self, request):
+        """What the bucket is per; None lets the request through (e.g. the field is missing)."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        bucket = settings.THROTTLES.get(self.scope)
+        key = self.get_key(request)
+        if bucket is None or not key:
+            return True
+
+        capacity, rate = bucket["CAPACITY"], bucket["REFILL_PER_MINUTE"] / 60
+        # hashed: the key is user input, which may be long or hold characters a cache key cannot
+        cache_key = f"throttle:{self.scope}:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"
+        with _lock:
+            now = time.time()
+            tokens, stamp = cache.get(cache_key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens < 1:
+                self.retry_after = (1 - tokens) / rate
+                return False
+            # a bucket left alone until it is full again is the same as no bucket
+            cache.set(cache_key, (tokens - 1, now), timeout=int(capacity / rate) + 1)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    def get_key(self, request):
+        return (request.data.get("username") or "").strip().lower()
+
+
+class AcademicEmailThrottle(TokenBucketThrottle):
+    def get_key(self, request):
+        return (request.data.get("academicEmail") or "").strip().lower()
+
+
+class SendCodeIPThrottle(IPThrottle):
+    scope = "send_code_ip"
+
+
+class SendCodeEmailThrottle(AcademicEmailThrottle):
+    scope = "send_code_email"
+
+
+class VerifyCodeIPThrottle(IPThrottle):
+    scope = "verify_code_ip"
+
+
+class VerifyCodeEmailThrottle(AcademicEmailThrottle):
+    scope = "verify_code_email"
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = "login_ip"
+
+
+class LoginUsernameThrottle(UsernameThrottle):
+    scope = "login_username"
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = "signup_ip"
+
+
+class SignupEmailThrottle(AcademicEmailThrottle):
+    scope = "signup_email"
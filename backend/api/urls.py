@@ -1,17 +1,25 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenBlacklistView, TokenRefreshView
 
 from .views.auth.login import login
 from .views.auth.me import me
 from .views.auth.signup.send_code import send_code
 from .views.auth.signup.signup import signup
 from .views.auth.signup.verify_code import verify_code
+from .views.metrics import metrics
 from .views.posts import feed
+from .views.reactions import comment_react, post_react
 
 urlpatterns = [
-    path("auth/send_code/", send_code),
-    path("auth/verify_code/", verify_code),
-    path("auth/signup/", signup),
-    path("auth/login/", login),
-    path("auth/me/", me),
+    path("auth/send_code/", send_code, name="auth_send_code"),
+    path("auth/verify_code/", verify_code, name="auth_verify_code"),
+    path("auth/signup/", signup, name="auth_signup"),
+    path("auth/login/", login, name="auth_login"),
+    path("auth/me/", me, name="auth_me"),
+    path("auth/refresh/", TokenRefreshView.as_view(), name="auth_refresh"),
+    path("auth/logout/", TokenBlacklistView.as_view(), name="auth_logout"),
     path("posts/feed/", feed, name="posts_feed"),
+    path("posts/<int:post_id>/react/", post_react, name="posts_react"),
+    path("comments/<int:comment_id>/react/", comment_react, name="comments_react"),
+    path("metrics/", metrics, name="metrics"),
 ]
@@ -1,13 +1,17 @@
 from django.contrib.auth import authenticate
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from ...hashing import PoolBusy
+from ...throttling import LoginIPThrottle, LoginUsernameThrottle
+from ...tokens import RefreshToken
 
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginUsernameThrottle])
 def login(request):
     username = (request.data.get("username") or "").strip().lower()
     password = request.data.get("password") or ""
@@ -18,7 +22,14 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    user = authenticate(request, username=username, password=password)
+    try:
+        user = authenticate(request, username=username, password=password)
+    except PoolBusy:
+        return Response(
+            {"message": "Too many logins right now, try again in a moment"},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": "1"},
+        )
     if not user:
         return Response(
             {"message": "Invalid credentials"},
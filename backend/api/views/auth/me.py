@@ -1,24 +1,39 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from ...async_views import async_api_view
+from ...conditional import make_etag, not_modified, set_validators
+from ...routers import replica_reads
 
-@api_view(["GET"])
+
+@replica_reads
+@async_api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def me(request):
+async def me(request):
     user = request.user
+    # joined in by the authentication, no query here
     profile = getattr(user, "profile", None)
 
+    # everything the body is built from: a username change does not touch the profile row
+    etag = make_etag(user.id, user.username, profile and profile.updated_at, profile and profile.profile_image.name)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
     avatar = None
     if profile and getattr(profile, "profile_image", None):
         avatar = request.build_absolute_uri(profile.profile_image.url)
 
-    return Response(
-        {
-            "id": user.id,
-            "username": user.username,
-            "avatar": avatar,
-        },
-        status=status.HTTP_200_OK,
+    return set_validators(
+        Response(
+            {
+                "id": user.id,
+                "username": user.username,
+                "avatar": avatar,
+            },
+            status=status.HTTP_200_OK,
+        ),
+        etag,
     )
@@ -2,15 +2,18 @@ import random
 import re
 
 from django.contrib.auth import get_user_model
-
-# from django.core.mail import send_mail
-from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from ....models import EmailVerification
+from ....outbox import enqueue
+from ....throttling import SendCodeEmailThrottle, SendCodeIPThrottle
 
 # if we want to add another uni we can just add the domain here:
 ALLOWED_DOMAINS = ["students.ptuk.edu.ps"]
@@ -18,7 +21,10 @@ ALLOWED_DOMAINS = ["students.ptuk.edu.ps"]
 
 def is_valid_academic_email_domain(email):
     email = (email or "").strip().lower()
-    if "@" not in email:
+    try:
+        # the whole address, not just its domain: it ends up in a mail header
+        validate_email(email)
+    except ValidationError:
         return False
     domain = email.split("@", 1)[1]
     return domain in ALLOWED_DOMAINS
@@ -29,9 +35,10 @@ User = get_user_model()
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+# one code a minute per email (and a few per IP), before any query
+@throttle_classes([SendCodeIPThrottle, SendCodeEmailThrottle])
 def send_code(request):
-    EmailVerification.objects.filter(expires_at__lt=timezone.now()).delete()
-
+    # expired codes are purged in the background (api/purge.py), the request only touches this email's rows
     username = (request.data.get("username") or "").strip()
     academic_email = (request.data.get("academicEmail") or "").strip().lower()
 
@@ -45,19 +52,15 @@ def send_code(request):
         )
 
     # Enforce username uniqueness
-    if User.objects.filter(username__iexact=username).exists():
+    # (case-insensitive, older accounts may have capitals; on lower(username), which has an index, where
+    # iexact would compile to a LIKE that scans auth_user)
+    if User.objects.alias(username_lower=Lower("username")).filter(username_lower=username).exists():
         return Response({"message": "Username already taken"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Enform domain
     if not is_valid_academic_email_domain(academic_email):
         return Response({"message": "academicEmail is invalid"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # prevent spam
-    last = EmailVerification.objects.filter(academic_email=academic_email).order_by("-created_at").first()
-
-    if last and (timezone.now() - last.created_at).total_seconds() < 60:
-        return Response({"message": "Please wait!!"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
-
     code = f"{random.randint(0, 999999):06d}"
 
     # remove old pending codes
@@ -65,16 +68,9 @@ def send_code(request):
 
     v = EmailVerification(username=username, academic_email=academic_email, code=code)
     v.set_expiry(minutes=10)
-    v.save()
-
-    # the email will be just printed for testing
-    print(f"[send-code] academic_email: {academic_email} code: {code}")
-    """send_mail(
-        subject="Your PTUK verification code",
-        message=f"Your verification code is: {code}",
-        from_email=None,
-        recipient_list=[academic_email],
-        fail_silently=False,
-    )"""
+    # queued, the send_outbox worker delivers it; no SMTP round trip in the request
+    with transaction.atomic():
+        v.save()
+        enqueue(academic_email, "Your PTUK verification code", f"Your verification code is: {code}")
 
     return Response({"message": "Verification code sent"}, status=status.HTTP_200_OK)
@@ -1,9 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 
+from ....hashing import PoolBusy, make_password
 from ....models import (
     EmailVerification,
     Instructor,
@@ -11,6 +12,7 @@ from ....models import (
     UniversityDomain,
     UserProfile,
 )
+from ....throttling import SignupEmailThrottle, SignupIPThrottle
 
 User = get_user_model()
 
@@ -35,6 +37,7 @@ def resolve_role_from_domain(domain: str) -> str:
 
 
 @api_view(["POST"])
+@throttle_classes([SignupIPThrottle, SignupEmailThrottle])
 def signup(request):
     username = (request.data.get("username") or "").strip().lower()
     academic_email = (request.data.get("academicEmail") or "").strip().lower()
@@ -70,12 +73,23 @@ def signup(request):
     uni_page = uni_row.page
     role = resolve_role_from_domain(uni_row.domain)
 
+    # hashed before the transaction, so SQLite's write lock is not held for it
+    try:
+        encoded_password = make_password(password)
+    except PoolBusy:
+        return Response(
+            {"message": "Too many signups right now, try again in a moment"},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": "1"},
+        )
+
     with transaction.atomic():
 
-        user = User.objects.create_user(
-            username=username,
-            email=personal_email,
-            password=password,
+        # create_user() without its set_password()
+        user = User.objects.create(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(personal_email),
+            password=encoded_password,
         )
 
         UserProfile.objects.create(
@@ -1,136 +1,88 @@
-from datetime import timedelta
-
-from django.db.models import Case, Count, F, IntegerField, Value, When
-from django.db.models.expressions import ExpressionWrapper
-from django.db.models.functions import Now
-from rest_framework.decorators import api_view, permission_classes
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from ..models import CommunityMember, FollowPage, Post
-
+from ..async_views import async_api_view
+from ..conditional import not_modified, set_validators
+from ..feed import cache as feed_cache
+from ..feed.cursor import InvalidCursor, after_cursor, decode_cursor, encode_cursor
+from ..feed.fanout import rebuild_user_feed
+from ..feed.projection import aproject_posts
+from ..feed.scoring import feed_rank, get_weights
+from ..feed.version import afeed_version
+from ..models import FeedEntry
+from ..routers import replica_reads
 
-def _get_user_university_page_id(user):
-    student = getattr(user, "student_profile", None)
-    if student and student.university_page_id:
-        return student.university_page_id
 
-    instructor = getattr(user, "instructor_profile", None)
-    if instructor and instructor.university_page_id:
-        return instructor.university_page_id
+async def needs_rebuild(user):
+    """First visit, or the user's communities or followed pages changed since the last rebuild."""
+    profile = getattr(user, "profile", None)
+    if profile is None:
+        # no profile to keep the marker on
+        return not await FeedEntry.objects.filter(user=user).aexists()
+    if profile.feed_rebuilt_at is None:
+        return True
+    return profile.feed_sources_changed_at is not None and profile.feed_sources_changed_at >= profile.feed_rebuilt_at
 
-    return None
 
+# async: under ASGI a feed read waiting on the database leaves the event loop free for other requests
 
-def file_url(request, f):
-    if not f:
-        return None
-    if isinstance(f, str):
-        return request.build_absolute_uri(f) if f.startswith("/") else f
-    try:
-        return request.build_absolute_uri(f.url)
-    except Exception:
-        return None
 
-
-@api_view(["GET"])
+@replica_reads
+@async_api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def feed(request):
+async def feed(request):
     limit = int(request.query_params.get("limit") or 20)
     limit = max(1, min(limit, 50))
 
+    cursor = request.query_params.get("cursor")
+
     user = request.user
 
-    community_ids = list(CommunityMember.objects.filter(user=user).values_list("community_id", flat=True))
-    followed_page_ids = list(FollowPage.objects.filter(user=user).values_list("page_id", flat=True))
-    uni_page_id = _get_user_university_page_id(user)
-
-    qs = (
-        Post.objects.all()
-        .annotate(
-            reactions_count=Count("reactions", distinct=True),
-            comments_count=Count("comments", distinct=True),
-            p_university=Case(
-                When(author_page_id=uni_page_id, then=Value(50)),
-                default=Value(0),
-                output_field=IntegerField(),
-            ),
-            p_community=Case(
-                When(community_id__in=community_ids, then=Value(30)),
-                default=Value(0),
-                output_field=IntegerField(),
-            ),
-            p_following=Case(
-                When(author_page_id__in=followed_page_ids, then=Value(20)),
-                default=Value(0),
-                output_field=IntegerField(),
-            ),
-            p_engagement=ExpressionWrapper(
-                (F("reactions_count") * Value(2)) + F("comments_count"),
-                output_field=IntegerField(),
-            ),
-        )
-        .annotate(
-            p_engagement_capped=Case(
-                When(p_engagement__gte=20, then=Value(20)),
-                default=F("p_engagement"),
-                output_field=IntegerField(),
-            ),
-            p_fresh=Case(
-                When(created_at__gte=Now() - timedelta(hours=6), then=Value(20)),
-                When(created_at__gte=Now() - timedelta(hours=24), then=Value(10)),
-                When(created_at__gte=Now() - timedelta(days=3), then=Value(5)),
-                default=Value(0),
-                output_field=IntegerField(),
-            ),
-        )
-        .annotate(
-            score=F("p_university") + F("p_community") + F("p_following") + F("p_engagement_capped") + F("p_fresh")
-        )
-        .order_by("-score", "-created_at")
-        .select_related("author_user", "author_page", "community")
-        .prefetch_related("media")
-    )[:limit]
-
-    data = []
-    for p in qs:
-        author_avatar = None
-        author_username = None
-        author_tag = None
-
-        if p.author_user_id:
-            author_username = p.author_user.username
-            profile = getattr(p.author_user, "profile", None)
-            if profile and getattr(profile, "profile_image", None):
-                author_avatar = file_url(request, getattr(profile, "profile_image", None))
-
-        if p.author_page_id:
-            author_username = p.author_page.page_name
-            author_tag = p.author_page.page_type
-            author_avatar = file_url(request, getattr(p.author_page, "profile_image", None))
-
-        media_items = []
-        for m in p.media.all().order_by("order_index"):
-            media_items.append(
-                {
-                    "type": (m.media_type or "").lower(),
-                    "url": file_url(request, m.media_file) or file_url(request, m.media_url),
-                }
-            )
-
-        data.append(
-            {
-                "id": p.post_id,
-                "content": p.content_text,
-                "post_type": p.post_type,
-                "created_at": p.created_at.isoformat(),
-                "author_username": author_username,
-                "author_avatar": author_avatar,
-                "tag": author_tag,
-                "media": media_items,
-                "likes_count": p.reactions_count,
-                "comments_count": p.comments_count,
-            }
-        )
-
-    return Response(data, status=200)
+    # sync calls: the local-memory cache answers without I/O, its a* methods would only add a thread hop
+    cache_key = feed_cache.page_key(user.id, limit, cursor)
+    cached = feed_cache.get_page(cache_key)
+    if cached is not None:
+        etag, payload = cached
+        return not_modified(request, etag) or set_validators(Response(payload), etag)
+
+    as_of, after = timezone.now(), None
+    if cursor:
+        try:
+            *after, as_of = decode_cursor(cursor)
+        except InvalidCursor:
+            return Response({"message": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # ranked on read: the stored affinity plus the post's engagement and freshness as of now
+    entries = (
+        FeedEntry.objects.filter(user=user)
+        .annotate(score=feed_rank(get_weights(), as_of))
+        .order_by("-score", "-created_at", "-post_id")
+    )
+    if after:
+        entries = entries.filter(after_cursor(*after))
+
+    if not cursor and await needs_rebuild(user):
+        await sync_to_async(rebuild_user_feed)(user)
+
+    etag = await afeed_version(user.id, limit, cursor, as_of)
+
+    # checked before the page is read and serialized, that is the work a 304 saves
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    # one extra row tells us whether there is a next page
+    page = [row async for row in entries.values_list("score", "created_at", "post_id")[: limit + 1]]
+
+    next_cursor = encode_cursor(*page[limit - 1], as_of) if len(page) > limit else None
+    post_ids = [post_id for _, _, post_id in page[:limit]]
+
+    data = await aproject_posts(request, post_ids)
+
+    payload = {"results": data, "next_cursor": next_cursor}
+    feed_cache.set_page(cache_key, (etag, payload))
+    return set_validators(Response(payload, status=200), etag)
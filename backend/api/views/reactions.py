@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .. import reactions
+from ..reaction_buffer import buffer
+
+# POST adds the reaction and DELETE removes it. Both are idempotent, so a double tap (or a retried
+# request) leaves the reaction as the user last asked instead of flipping it back.
+
+
+def _toggle(request, target, pk):
+    if settings.REACTION_BUFFER["ENABLED"]:
+        # written by the next flush; the client already shows the tap, so there is nothing to wait for
+        buffer.add(target, pk, request.user.id, reacted=request.method == "POST")
+        return Response({"reacted": request.method == "POST", "queued": True}, status=status.HTTP_202_ACCEPTED)
+
+    if request.method == "POST":
+        changed, count = reactions.react(target, pk, request.user.id)
+    else:
+        changed, count = reactions.unreact(target, pk, request.user.id)
+
+    if count is None:
+        return Response({"message": "not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(
+        {"reacted": request.method == "POST", "changed": changed, "reactions_count": count},
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def post_react(request, post_id):
+    return _toggle(request, reactions.POST, post_id)
+
+
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def comment_react(request, comment_id):
+    return _toggle(request, reactions.COMMENT, comment_id)
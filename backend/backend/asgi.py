@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_asgi_application()
+
+# the web process's background jobs, started here rather than by a request (management commands skip them)
+from api.purge import scheduler  # noqa: E402
+
+scheduler.start()
@@ -52,7 +52,17 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("api.authentication.CachedJWTAuthentication",),
+    # orjson (stdlib when it is missing), see api/renderers.py
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # CORS_ALLOW_ALL_ORIGINS = False
@@ -62,6 +72,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -72,6 +84,17 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Response compression (see api/middleware.py): brotli when the brotli package is installed, else gzip.
+# Only the listed content types (prefixes), images and other media are compressed already. The views
+# (URL names) in SKIP_VIEWS return tokens and are never compressed, against BREACH.
+COMPRESSION = {
+    "MIN_SIZE": 500,
+    "CONTENT_TYPES": ["application/json", "text/", "application/javascript", "image/svg+xml"],
+    "SKIP_VIEWS": ["auth_login", "auth_refresh"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+}
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -85,6 +108,17 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Mail is queued in the outbox_email table and delivered by `manage.py send_outbox` (see api/outbox.py):
+# BATCH_SIZE mails per batch over one connection, a failed mail retried after BACKOFF_SECONDS (doubling)
+# up to MAX_ATTEMPTS times. LEASE_SECONDS is how long a claimed batch is kept from other workers.
+OUTBOX = {
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_SECONDS": 30,
+    "LEASE_SECONDS": 120,
+    "POLL_SECONDS": 2,
+}
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -106,13 +140,108 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers don't block the writer and vice versa
+    "synchronous": "NORMAL",  # fsync at checkpoints only, still safe in WAL mode
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -20000,  # KiB, so ~20 MB of page cache per connection
+    "temp_store": "MEMORY",
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "api.sqlite",
         "NAME": BASE_DIR / "db.sqlite3",
+        # keep connections open across requests (each worker thread has its own)
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        # queue this process's write transactions, see api/sqlite/base.py
+        "SERIALIZE_WRITES": os.environ.get("SQLITE_SERIALIZE_WRITES", "1") == "1",
+        "OPTIONS": {
+            # take the write lock at BEGIN instead of failing to upgrade a read lock halfway through
+            "transaction_mode": "IMMEDIATE",
+            # seconds, SQLite's busy_timeout
+            "timeout": 20,
+            "init_command": "".join(f"PRAGMA {name}={value};" for name, value in SQLITE_PRAGMAS.items()),
+        },
     }
 }
 
+# Read-only copies of db.sqlite3 (kept current by e.g. litestream), comma separated paths. Views
+# decorated with @replica_reads and admin changelists read from them, see api/routers.py
+DATABASE_REPLICAS = []
+for i, path in enumerate(filter(None, os.environ.get("SQLITE_REPLICAS", "").split(",")), start=1):
+    DATABASES[f"replica{i}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{path}?mode=ro",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "init_command": "".join(
+                f"PRAGMA {name}={value};" for name, value in SQLITE_PRAGMAS.items() if name != "journal_mode"
+            ),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{i}")
+
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# in-process by default; switch to FileBasedCache or DatabaseCache to share it between workers
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "campus",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+
+SIMPLE_JWT = {
+    # every refresh hands out a new refresh token and blacklists the one it was given
+    "ROTATE_REFRESH_TOKENS": True,
+    "BLACKLIST_AFTER_ROTATION": True,
+    # their blacklist check goes through api/blacklist.py
+    "TOKEN_REFRESH_SERIALIZER": "api.tokens.TokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "api.tokens.TokenBlacklistSerializer",
+}
+
+# blacklisted JTIs are kept in a Bloom filter (api/blacklist.py)
+BLACKLIST_FALSE_POSITIVE_RATE = 0.01
+# how stale a worker's filter may get: blacklistings bump a generation in the cache, which every worker
+# sharing it checks on each refresh; with a per-process cache (locmem) a token revoked on another worker
+# is still accepted here for up to this many seconds
+BLACKLIST_SYNC_SECONDS = 30
+
+# seconds an authenticated user (with profile, student and instructor rows) stays cached, see
+# api/authentication.py; saves invalidate it, but only in this process's cache while CACHES is locmem
+AUTH_USER_CACHE_TTL = 60
+
+
+# Token buckets for the auth endpoints (see api/throttling.py), per client IP and per username or
+# academic email: CAPACITY requests at once, refilled at REFILL_PER_MINUTE. A scope left out is not throttled.
+THROTTLES = {
+    "send_code_ip": {"CAPACITY": 10, "REFILL_PER_MINUTE": 5},
+    # a code a minute per email after a small burst: the bucket is charged before the request is
+    # validated, so a typo'd username (a 400) must not lock the student out of their next try
+    "send_code_email": {"CAPACITY": 3, "REFILL_PER_MINUTE": 1},
+    "verify_code_ip": {"CAPACITY": 20, "REFILL_PER_MINUTE": 10},
+    # a 6 digit code gets a handful of guesses, not a million
+    "verify_code_email": {"CAPACITY": 5, "REFILL_PER_MINUTE": 1},
+    "login_ip": {"CAPACITY": 30, "REFILL_PER_MINUTE": 15},
+    # Trade-off of the per-account buckets (login_username, and the *_email ones): anyone who knows a
+    # username or email can spend its bucket and lock its owner out for a while. That is accepted to
+    # stop password/code guessing spread over many IPs; the refill keeps such a lockout to minutes.
+    "login_username": {"CAPACITY": 10, "REFILL_PER_MINUTE": 5},
+    "signup_ip": {"CAPACITY": 10, "REFILL_PER_MINUTE": 5},
+    "signup_email": {"CAPACITY": 5, "REFILL_PER_MINUTE": 2},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,3 +283,59 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Home feed
+# feed_entry keeps at most this many posts per user (see api/feed/fanout.py)
+
+FEED_MAX_ENTRIES = 500
+FEED_FANOUT_BATCH_SIZE = 1000
+# seconds a rendered feed page stays cached (see api/feed/cache.py)
+FEED_CACHE_TTL = 30
+
+# candidate posts scored when a feed is rebuilt (see api/feed/candidates.py)
+FEED_CANDIDATES_PER_SOURCE = 200
+FEED_CANDIDATE_WINDOW_DAYS = 14
+FEED_GLOBAL_CANDIDATES = 300
+FEED_GLOBAL_WINDOW_HOURS = 72
+
+# feed ranking weights, see DEFAULT_WEIGHTS in api/feed/scoring.py for every key
+FEED_WEIGHTS = {
+    "UNIVERSITY": 50,
+    "COMMUNITY": 30,
+    "FOLLOWING": 20,
+    "REACTION": 2,
+    "COMMENT": 1,
+    "ENGAGEMENT_CAP": 20,
+    "FRESHNESS": [(6, 20), (24, 10), (72, 5)],
+}
+
+# Per-view request/DB metrics, served to admins at /api/metrics/
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# Password hashing and verification run on a bounded thread pool (see api/hashing.py): login and
+# signup answer 429 once WORKERS are hashing and MAX_QUEUE more are waiting. WORKERS=0 hashes on
+# the request thread, unbounded. Half the CPUs by default, the other half stay for everything else.
+PASSWORD_HASHING = {
+    "WORKERS": int(os.environ.get("PASSWORD_HASHING_WORKERS", max(1, (os.cpu_count() or 1) // 2))),
+    "MAX_QUEUE": int(os.environ.get("PASSWORD_HASHING_MAX_QUEUE", "4")),
+}
+
+AUTHENTICATION_BACKENDS = ["api.hashing.PooledModelBackend"]
+
+# Expired email verification codes are purged every INTERVAL_SECONDS by a thread in each web process,
+# started when the process loads backend/wsgi.py or backend/asgi.py (see api/purge.py). 0 turns it off:
+# run `manage.py purge_verifications` from cron instead.
+VERIFICATION_PURGE = {
+    "INTERVAL_SECONDS": int(os.environ.get("VERIFICATION_PURGE_INTERVAL", "300")),
+    "BATCH_SIZE": 500,
+}
+
+# Coalesced reaction writes (see api/reaction_buffer.py): off by default, every reaction is
+# then its own transaction; on, they are journaled and written in batches
+REACTION_BUFFER = {
+    "ENABLED": os.environ.get("REACTION_BUFFER", "0") == "1",
+    "FLUSH_INTERVAL_MS": int(os.environ.get("REACTION_BUFFER_FLUSH_MS", "100")),
+    "MAX_EVENTS": 1000,
+    "JOURNAL_DIR": BASE_DIR / "reaction_journal",
+}
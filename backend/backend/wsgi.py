@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# the web process's background jobs, started here rather than by a request (management commands skip them)
+from api.purge import scheduler  # noqa: E402
+
+scheduler.start()
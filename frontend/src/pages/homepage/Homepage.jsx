@@ -91,7 +91,7 @@ export default function Homepage() {
           return
         }
 
-        setPosts(Array.isArray(data) ? data : [])
+        setPosts(Array.isArray(data?.results) ? data.results : [])
       } catch {
         setError("Something went wrong")
         setPosts([])